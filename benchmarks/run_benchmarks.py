@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the UBayFS hot paths on synthetic data.
+
+Times the ensemble build (``UBaymodel.__init__``) per method, ``UBayconstraint.group_admissibility`` for single 
+feature sets and batches, ``sampleInitial``, ``train`` and ``evaluateFS`` on a grid of problem sizes, 
+and writes the results as JSON.
+
+Usage::
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --n-features 100 1000 --M 50 --methods fast_mrmr fisher
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import scipy
+import sklearn
+from sklearn.datasets import make_classification, make_regression
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "UBayFS"))
+from UBaymodel import UBaymodel
+from UBayconstraint import UBayconstraint
+
+
+def make_data(n_samples, n_features, task="classification", random_state=0):
+    """
+    Generate a synthetic dataset with 10% informative features.
+    """
+    n_informative = max(2, n_features // 10)
+    if task == "classification":
+        X, y = make_classification(n_samples=n_samples, n_features=n_features, n_informative=n_informative,
+                                   n_redundant=min(n_informative, n_features - n_informative), random_state=random_state)
+    else:
+        X, y = make_regression(n_samples=n_samples, n_features=n_features, n_informative=n_informative, 
+                               random_state=random_state)
+    return X, y
+
+
+def make_constraints(n_features, n_constraints, max_size, random_state=0):
+    """
+    Generate a hard max-size constraint and ``n_constraints`` random must-link and cannot-link constraints 
+    on 2 to 5 features each.
+    """
+    rng = np.random.default_rng(random_state)
+    types = ["max_size"] + list(rng.choice(["must_link", "cannot_link"], size=n_constraints))
+    variables = [max_size] + [list(rng.choice(n_features, size=rng.integers(2, 6), replace=False)) 
+                              for _ in range(n_constraints)]
+    rho = np.concatenate([[np.inf], rng.uniform(0.1, 10, size=n_constraints)])
+    return UBayconstraint(rho=rho, constraint_types=types, constraint_vars=variables, num_elements=n_features)
+
+
+def timeit(fun, repeat):
+    """
+    Run ``fun`` ``repeat`` times.
+    
+    Returns
+    -----
+    A <dictionary> with the minimal, median and maximal wall time in seconds, and the result of the last call.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fun()
+        times.append(time.perf_counter() - start)
+    return {"min": min(times), "median": float(np.median(times)), "max": max(times), "repeat": repeat}, result
+
+
+def environment():
+    """
+    Describe the machine and package versions.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, 
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = None
+    return {"python": platform.python_version(), "platform": platform.platform(), "processor": platform.processor(),
+            "cpu_count": os.cpu_count(), "numpy": np.__version__, "scipy": scipy.__version__, 
+            "pandas": pd.__version__, "scikit-learn": sklearn.__version__, "commit": commit}
+
+
+def run(args):
+    results = []
+    
+    def record(benchmark, params, timing):
+        entry = {"benchmark": benchmark, **params, **timing}
+        results.append(entry)
+        print(json.dumps(entry), flush=True)
+    
+    for n_samples, n_features in itertools.product(args.n_samples, args.n_features):
+        X, y = make_data(n_samples, n_features, task=args.task, random_state=args.seed)
+        nr_features = min(args.nr_features, n_features - 1)
+        size = {"n_samples": n_samples, "n_features": n_features, "task": args.task}
+        
+        # ensemble build per method
+        models = {}
+        for method, M in itertools.product(args.methods, args.M):
+            timing, models[method] = timeit(lambda: UBaymodel(X, y, M=M, nr_features=nr_features, method=[method], 
+                                                              random_state=args.seed, n_jobs=args.n_jobs), args.repeat)
+            record("init", {**size, "method": method, "M": M, "nr_features": nr_features, "n_jobs": args.n_jobs}, timing)
+        model = models[args.methods[0]]
+        post_scores = model.posteriorExpectation()
+        
+        for n_constraints in args.n_constraints:
+            constraints = make_constraints(n_features, n_constraints, nr_features, random_state=args.seed)
+            model.setConstraints(constraints)
+            params = {**size, "n_constraints": n_constraints}
+            
+            rng = np.random.default_rng(args.seed)
+            state = (rng.random(n_features) < nr_features / n_features).astype(int)
+            timing, _ = timeit(lambda: constraints.group_admissibility(state), args.repeat)
+            record("group_admissibility", {**params, "batch_size": 1}, timing)
+            for popsize in args.popsize:
+                states = (rng.random((popsize, n_features)) < nr_features / n_features).astype(int)
+                timing, _ = timeit(lambda: constraints.group_admissibility(states), args.repeat)
+                record("group_admissibility", {**params, "batch_size": popsize}, timing)
+                
+                timing, _ = timeit(lambda: model.sampleInitial(post_scores, popsize), args.repeat)
+                record("sampleInitial", {**params, "popsize": popsize}, timing)
+                
+                model.setOptim("GA", popsize, args.maxiter)
+                timing, (selection, _) = timeit(model.train, args.repeat)
+                record("train", {**params, "popsize": popsize, "maxiter": args.maxiter}, timing)
+            
+            timing, _ = timeit(lambda: model.evaluateFS(selection.values[:,0]), args.repeat)
+            record("evaluateFS", params, timing)
+    
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-samples", type=int, nargs="+", default=[200], help="Numbers of samples.")
+    parser.add_argument("--n-features", type=int, nargs="+", default=[50, 500], help="Numbers of features.")
+    parser.add_argument("--M", type=int, nargs="+", default=[20], help="Numbers of ensemble models.")
+    parser.add_argument("--methods", nargs="+", default=["fast_mrmr", "mrmr", "fisher", "mutual_info", "f_test"], 
+                        help="Ensemble feature selectors, each timed separately.")
+    parser.add_argument("--nr-features", type=int, default=10, help="Features per ensemble model and max-size constraint.")
+    parser.add_argument("--popsize", type=int, nargs="+", default=[50, 200], help="GA population sizes.")
+    parser.add_argument("--maxiter", type=int, default=50, help="GA iterations.")
+    parser.add_argument("--n-constraints", type=int, nargs="+", default=[10, 100], 
+                        help="Numbers of must-link/cannot-link constraints besides the max-size constraint.")
+    parser.add_argument("--task", choices=["classification", "regression"], default="classification")
+    parser.add_argument("--n-jobs", type=int, default=1, help="Worker processes for the ensemble build.")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions per benchmark.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON output file.")
+    args = parser.parse_args()
+    
+    if args.task == "regression":
+        args.methods = [m for m in args.methods if m not in ["chi", "chi2", "fisher"]]
+    
+    start = time.strftime("%Y-%m-%dT%H:%M:%S")
+    results = run(args)
+    with open(args.output, "w") as f:
+        json.dump({"started": start, "environment": environment(), "settings": vars(args), "results": results}, f, indent=2)
+    print("Results written to", args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,11 +11,29 @@ from sklearn.model_selection import train_test_split
 from random import sample
 from sklearn.feature_selection import SelectKBest, chi2
 #from skfeature.function.similarity_based import fisher_score
-from scipy.special import logsumexp
-import math
 import sys
+import scipy.sparse as sp
 from itertools import chain
 
+def is_identity(matrix):
+    """
+    Check whether a (sparse) matrix is the identity matrix.
+    """
+    matrix = sp.csr_matrix(matrix)
+    if matrix.shape[0] != matrix.shape[1]:
+        return False
+    return (matrix != sp.identity(matrix.shape[0], format="csr")).nnz == 0
+
+
+def same_matrix(matrix1, matrix2):
+    """
+    Check whether two (sparse) matrices are equal.
+    """
+    if np.shape(matrix1) != np.shape(matrix2):
+        return False
+    return (sp.csr_matrix(matrix1) != sp.csr_matrix(matrix2)).nnz == 0
+
+
 class UBayconstraint():
     """
     This class initializes user-defined constraints.
@@ -24,12 +42,13 @@ class UBayconstraint():
     -----
     rho: <numpy array> 
         Vector of regularization strenghts for the defined constraints.
-    A: <numpy array> 
-        Matrix describing constraints. Left side of the equation system. Default: ``A=None``
+    A: <numpy array> or <scipy sparse matrix>
+        Matrix describing constraints. Left side of the equation system. Stored as sparse CSR matrix. Default: ``A=None``
     b : <numpy array>
         1-d dimensional array defining the right sight of the equation system. Default: ``b=None``
-    block_matrix : <numpy array>
-        Matrix describing the block assignment for each feature. If no block-structure given, block_matrix is a diagonal-unity matrix. Default : ``block_matrix=None``.
+    block_matrix : <numpy array> or <scipy sparse matrix>
+        Matrix describing the block assignment for each feature. If no block-structure given, block_matrix is a diagonal-unity matrix. 
+        Stored as sparse CSR matrix. Default : ``block_matrix=None``.
     block_list : <list>
         List describing the block assignment for each feature, if block structure is present. Default : ``block_list=None``.
     constraint_types : <list> of <strings>
@@ -58,88 +77,108 @@ class UBayconstraint():
             if np.any(rho <=0):
                 sys.exit("rho values must be >0")
             
-            if len(A) != len(b) != len(rho):
+            if (A.shape[0] != len(b)) or ((not rho_single) and (len(b) != len(rho))):
                 sys.exit("Constraint dimensions do not fit!")
             
-            
-                
-            self.A = A
-            self.b = b
+            self.A = sp.csr_matrix(A, dtype=float)
+            self.b = np.asarray(b, dtype=float)
             
             if rho_single:
                 self.rho = np.repeat(rho, self.A.shape[0])
             else:
-                self.rho = rho
+                self.rho = np.asarray(rho, dtype=float)
             
         else:
+            # constraint rows are collected as chunks of column indices and values, 
+            # the sparse matrix is assembled once at the end
+            row_cols = []
+            row_vals = []
+            row_nnz = []
+            b_list = []
+            rho_list = []
             
-            self.A = np.empty((0,num_elements), int)
-            self.b = np.empty(0)
-            self.rho = np.empty(0)
-
-            
-            def max_size(smax):
-                self.A = np.append(self.A, np.ones((1,num_elements)), axis=0)
-                self.b = np.append(self.b, smax)
+            def max_size(smax, r):
+                row_cols.append(np.arange(num_elements))
+                row_vals.append(np.ones(num_elements))
+                row_nnz.append([num_elements])
+                b_list.append([smax])
+                rho_list.append([r])
                 
-                
-            def must_link(sel):
+            def must_link(sel, r):
                 if len(sel) > 1:
-                    pairs = [(x, y) for x in sel for y in sel if x != y]
-                    for pair in pairs:
-                        new_row = 1*np.array((np.arange(0,num_elements) == pair[0])) - \
-                    1*np.array((np.arange(0,num_elements) == pair[1]))
-                        new_row = new_row.reshape(1, len(new_row))
-                        self.A = np.append(self.A, new_row, axis=0)
-                        self.b = np.append(self.b, 0)
+                    # all ordered pairs (x, y) with x != y, one row x - y <= 0 per pair
+                    x, y = np.meshgrid(sel, sel, indexing="ij")
+                    pairs = np.column_stack((x.ravel(), y.ravel()))
+                    pairs = pairs[pairs[:,0] != pairs[:,1]]
+                    row_cols.append(pairs.ravel())
+                    row_vals.append(np.tile([1., -1.], len(pairs)))
+                    row_nnz.append(np.repeat(2, len(pairs)))
+                    b_list.append(np.zeros(len(pairs)))
+                    rho_list.append(np.repeat(r, len(pairs)))
 
-            def cannot_link(sel):
+            def cannot_link(sel, r):
                 if len(sel) > 1:
-                    new_row = np.zeros((1,num_elements))
-                    new_row[:,sel] = 1
-                    self.A = np.append(self.A, new_row, axis=0)
-                    self.b = np.append(self.b, 1)
+                    row_cols.append(np.unique(sel))
+                    row_vals.append(np.ones(len(np.unique(sel))))
+                    row_nnz.append([len(np.unique(sel))])
+                    b_list.append([1])
+                    rho_list.append([r])
                     
             # iterate over constraints
             # check if all constraint types in max, must, cannot
             for i, (cv, ct) in enumerate(zip(constraint_vars, constraint_types)):
+                r = rho[0] if rho_single else rho[i]
                 if ct == "max_size":
-                    max_size(cv)
-                    if rho_single:
-                        self.rho = np.append(self.rho, rho[0])
-                    else:
-                        self.rho = np.append(self.rho, rho[i])
+                    max_size(cv, r)
                 elif ct == "must_link":
-                    must_link(cv)
-                    N = len(cv)
-                    combinations = math.factorial(N) / math.factorial((N-2))
-                    if rho_single:
-                        self.rho = np.append(self.rho, np.repeat(rho[0],combinations))
-                    else:
-                        self.rho = np.append(self.rho, np.repeat(rho[i],combinations))
+                    must_link(cv, r)
                 elif ct == "cannot_link":
-                    cannot_link(cv)
-                    if rho_single:
-                        self.rho = np.append(self.rho, rho[0])
-                    else:
-                        self.rho = np.append(self.rho, rho[i])
+                    cannot_link(cv, r)
                 else:
                     print("The constraint type '", ct, "' is unknown.")
+            
+            indptr = np.concatenate([[0]] + row_nnz).cumsum().astype(np.int64)
+            indices = np.concatenate([[]] + row_cols).astype(np.int64)
+            data = np.concatenate([[]] + row_vals).astype(float)
+            self.b = np.concatenate([[]] + b_list).astype(float)
+            self.rho = np.concatenate([[]] + rho_list).astype(float)
+            self.A = sp.csr_matrix((data, indices, indptr), shape=(len(self.b), num_elements))
 
             
         if (block_matrix is None) and (block_list is None):
-            block_matrix = np.identity(np.shape(self.A)[1])
-            self.block_matrix = block_matrix  
+            self.block_matrix = sp.identity(np.shape(self.A)[1], format="csr")
             
         elif (block_matrix is None) and (block_list is not None):
             
-            block_matrix = np.zeros((len(block_list), (max(list(chain.from_iterable(block_list)))+1)))
-            for i in range(len(block_list)):
-                block_matrix[i,block_list[i]] = 1
+            num_features = max(list(chain.from_iterable(block_list)))+1
+            rows = np.concatenate([np.repeat(i, len(block)) for i, block in enumerate(block_list)])
+            cols = np.concatenate([np.asarray(block) for block in block_list])
+            block_matrix = sp.csr_matrix((np.ones(len(cols)), (rows, cols)), shape=(len(block_list), num_features))
+            block_matrix.data[:] = 1
             self.block_matrix = block_matrix
         else:
-            self.block_matrix = block_matrix
+            self.block_matrix = sp.csr_matrix(block_matrix, dtype=float)
+        
+        self.compile()
          
+    def compile(self):
+        """
+        Precompute the quantities needed to evaluate the admissibility: constraints with finite and infinite rho 
+        are split once, and identity block matrices are detected to skip the block transformation.
+        Must be called again whenever A, b, rho or block_matrix are modified.
+        """
+        self.A = sp.csr_matrix(self.A, dtype=float)
+        self.block_matrix = sp.csr_matrix(self.block_matrix, dtype=float)
+        
+        ind_inf = np.where(self.rho == np.inf)[0]
+        ind_non_inf = np.where(self.rho != np.inf)[0]
+        
+        self.identity_block = is_identity(self.block_matrix)
+        self.A_non_inf = self.A[ind_non_inf,:]
+        self.b_non_inf = self.b[ind_non_inf]
+        self.rho_non_inf = self.rho[ind_non_inf]
+        self.A_inf = self.A[ind_inf,:]
+        self.b_inf = self.b[ind_inf]
         
     def get_dimensions(self):
         """
@@ -159,45 +198,54 @@ class UBayconstraint():
         -----
         state: <np.array>
             1-dimensional binary array describing a feature set. 1: feature selected, 0: feature not selected.
+            Alternatively, a 2-dimensional binary array with one feature set per row.
         log : <boolean>
             Indicates whether the admissibility should be returned on log scale.
         
         Returns
         -----
-        An admissibility value <float>.
+        An admissibility value <float>, or a <np.array> with one admissibility value per row if state is 2-dimensional.
         """
-        if not len(state) == self.get_dimensions()[1]:
+        single = (np.ndim(state) == 1)
+        state = np.atleast_2d(state)
+        if not state.shape[1] == self.get_dimensions()[1]:
             sys.exit("Wrong size of state!")
-            
-        state = np.matmul(self.block_matrix, state) > 0
         
-        ind_inf = np.where(self.rho == np.inf)[0]
-        ind_non_inf = np.where(self.rho != np.inf)[0]
+        num_states = state.shape[0]
+        
+        # block states, one column per feature set
+        if self.identity_block:
+            state = np.transpose(state > 0).astype(float)
+        else:
+            state = (self.block_matrix @ np.transpose(state).astype(float) > 0).astype(float)
         
         # case 1: rho < Inf
-        if len(ind_non_inf) > 0:
-           const_not_fulfilled =  np.where(self.b[ind_non_inf] - \
-           np.matmul(self.A[ind_non_inf,:], state) < 0)[0]
-    
-           z = self.b[ind_non_inf] - \
-           np.matmul(self.A[ind_non_inf,:], state) * self.rho[ind_non_inf]
-           
-           lprob1 = np.log(2) + z - np.apply_along_axis(logsumexp, 1, np.column_stack((z,np.zeros(len(z)))))
-           lprob1 = np.sum(lprob1[const_not_fulfilled])
+        if len(self.b_non_inf) > 0:
+            lhs = np.transpose(self.A_non_inf @ state)
+            const_not_fulfilled = self.b_non_inf - lhs < 0
+            
+            # log(2) + log-sigmoid(z)
+            z = self.b_non_inf - lhs * self.rho_non_inf
+            lprob1 = np.log(2) - np.logaddexp(0, -z)
+            lprob1 = np.sum(np.where(const_not_fulfilled, lprob1, 0), axis=1)
         else:
-           lprob1 = 0
+            lprob1 = np.zeros(num_states)
            
-        if len(ind_inf) > 0:
-            z = self.b[ind_inf] - \
-            np.matmul(self.A[ind_inf,:], state) >= 0
-            lprob2 = np.sum(np.log(z))
+        # case 2: rho = Inf
+        if len(self.b_inf) > 0:
+            z = self.b_inf - np.transpose(self.A_inf @ state) >= 0
+            lprob2 = np.where(np.all(z, axis=1), 0, -np.inf)
         else:
-            lprob2 = 0
+            lprob2 = np.zeros(num_states)
+        
+        lprob = lprob1 + lprob2
+        if single:
+            lprob = lprob[0]
            
         if log:
-            return lprob1 + lprob2
+            return lprob
         else:
-            return np.exp(lprob1 + lprob2)
+            return np.exp(lprob)
     
     def get_maxsize(self):
         """
@@ -209,9 +257,11 @@ class UBayconstraint():
         """
         ms = None
         
-        if np.array_equal(self.block_matrix, np.identity(np.shape(self.A)[1])):
-            for j in range(len(self.A)):
-                if np.array_equal(self.A[j,:], np.ones(len(self.A[j,:]))):
+        if self.identity_block:
+            num_elements = self.A.shape[1]
+            row_nnz = np.diff(self.A.indptr)
+            for j in np.where(row_nnz == num_elements)[0]:
+                if np.all(self.A.data[self.A.indptr[j]:self.A.indptr[j+1]] == 1):
                     ms = self.b[j]
         return ms
         
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Timing instrumentation for UBaymodel.
+"""
+
+import numpy as np
+import pandas as pd
+import time
+from contextlib import contextmanager
+
+
+class UBaymetrics():
+    """
+    Opt-in collection of wall times and call counts of a UBaymodel. Pass an instance as ``metrics`` to the UBaymodel
+    or attach it with ``setMetrics``; without metrics object, no timing code is executed.
+
+    Recorded are:
+        - phases : wall time and number of calls of ``ensemble`` (selectors incl. splits), ``assembly`` (ensemble store),
+          ``train``, ``initialization`` (``sampleInitial``), ``GA``, ``milp``, ``local search``, and the preprocessing 
+          steps ``reduction`` and ``screening``, and ``posterior sampling``
+        - methods : wall time, number of calls and number of failures per ensemble feature selector
+        - members : wall time of the split and of all selectors per ensemble model
+        - generations : wall time, number of fitness evaluations and best fitness per GA generation 
+          (for "islands": summed over the islands, with the best fitness of all islands)
+        - fitness : number of fitness calls and of evaluated feature sets
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """
+        Delete all records.
+        """
+        self.phases = {}
+        self.methods = {}
+        self.members = []
+        self.generations = []
+        self.fitness_calls = 0
+        self.fitness_evaluations = 0
+        self.runs = 0
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Context manager measuring the wall time of a phase.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+
+    def add_phase(self, name, seconds):
+        """
+        Add one call of a phase.
+        """
+        calls, total = self.phases.get(name, (0, 0.))
+        self.phases[name] = (calls + 1, total + seconds)
+
+    def add_member(self, member_index, split_seed, times, method_names, failed):
+        """
+        Add the timings of one ensemble model.
+
+        PARAMETERS
+        -----
+        times : <dictionary>
+            Wall time of the train/test split (``split``) and list of wall times per method (``methods``).
+        failed : <list> of <boolean>
+            Indicates for each method whether it failed.
+        """
+        self.members.append({"member": member_index, "split_seed": split_seed, "split": times["split"],
+                             **{name: t for name, t in zip(method_names, times["methods"])}})
+        for name, t, f in zip(method_names, times["methods"], failed):
+            calls, total, fails = self.methods.get(name, (0, 0., 0))
+            self.methods[name] = (calls + 1, total + t, fails + int(f))
+
+    def add_fitness(self, num_states, calls=1):
+        """
+        Add ``calls`` fitness calls evaluating ``num_states`` feature sets in total.
+        """
+        self.fitness_calls += calls
+        self.fitness_evaluations += num_states
+    
+    def new_run(self):
+        """
+        Start a new optimization run.
+        
+        Returns
+        -----
+        The <int> number of the run.
+        """
+        self.runs += 1
+        return self.runs
+    
+    def add_generation(self, run, generation, seconds, fitness_evaluations, best_fitness):
+        """
+        Add one generation of a GA run.
+        """
+        self.generations.append({"run": run, "generation": generation, "seconds": seconds,
+                                 "fitness_evaluations": fitness_evaluations, "best_fitness": best_fitness})
+
+    def generation_callbacks(self):
+        """
+        Callbacks for pygad recording each generation of a GA run.
+
+        Returns
+        -----
+        A <tuple> with the ``on_start`` and ``on_generation`` functions.
+        """
+        run = self.new_run()
+        last = {}
+
+        def on_start(ga_instance):
+            last["time"] = time.perf_counter()
+            last["evaluations"] = self.fitness_evaluations
+
+        def on_generation(ga_instance):
+            now = time.perf_counter()
+            self.add_generation(run, ga_instance.generations_completed, now - last["time"], 
+                                self.fitness_evaluations - last["evaluations"], 
+                                float(np.max(ga_instance.last_generation_fitness)))
+            last["time"] = now
+            last["evaluations"] = self.fitness_evaluations
+
+        return on_start, on_generation
+
+    def summary(self):
+        """
+        Summary of all records.
+
+        Returns
+        -----
+        A <dictionary> with <pandas dataframes> ``phases``, ``methods``, ``members`` and ``generations``,
+        and the fitness counters ``fitness_calls`` and ``fitness_evaluations``.
+        """
+        return {"phases": pd.DataFrame([(k, c, s) for k, (c, s) in self.phases.items()],
+                                       columns=["phase", "calls", "seconds"]).set_index("phase"),
+                "methods": pd.DataFrame([(k, c, s, f) for k, (c, s, f) in self.methods.items()],
+                                        columns=["method", "calls", "seconds", "fails"]).set_index("method"),
+                "members": pd.DataFrame(self.members),
+                "generations": pd.DataFrame(self.generations),
+                "fitness_calls": self.fitness_calls,
+                "fitness_evaluations": self.fitness_evaluations}
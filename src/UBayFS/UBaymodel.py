@@ -8,16 +8,365 @@ Created on Fri May 12 11:55:40 2023
 import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
-from random import sample, seed
-from sklearn.feature_selection import SelectKBest, chi2
 import mrmr
 import sys
 from scipy.special import logsumexp
+from scipy.stats import rankdata, beta
+from scipy.optimize import milp, LinearConstraint, Bounds
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
 from pygad import GA
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from itertools import repeat
+from collections import OrderedDict
+import json
+import struct
+import zipfile
+import os
+import glob
+import time
+from contextlib import nullcontext
+import copy
 
 
 # import from own files
-from UBayconstraint import UBayconstraint
+from UBayconstraint import UBayconstraint, same_matrix
+from UBaymetrics import UBaymetrics
+from UBaysearch import LocalSearch
+from UBayselectors import FILTER_METHODS, CLASSIFICATION_METHODS, filter_ranks, MRMREngine, column_range
+
+
+def _ensemble_member(data, target, binary, tt_split, nr_features, method, member_seed, mrmr_engine=None, timed=False):
+    """
+    Fit all ensemble feature selectors on a single train/test split.
+    
+    PARAMETERS
+    -----
+    member_seed : <numpy SeedSequence>
+        Seed of the ensemble model, determining the split and the number of features.
+    mrmr_engine : <MRMREngine>
+        Shared mRMR engine on the full data, required for method ``fast_mrmr``.
+    timed : <boolean>
+        Measure the wall time of the split and of each method.
+    
+    Returns
+    -----
+    A <tuple> with the seed of the train/test split, a <list> with one entry per method 
+    (the indices of the selected features, or the raised exception if the method failed), 
+    and a <dictionary> with the wall times if ``timed``, otherwise None.
+    """
+    if timed:
+        start = time.perf_counter()
+    rng = np.random.default_rng(member_seed)
+    split_seed = int(rng.integers(np.iinfo(np.int32).max))
+    
+    if binary == True:
+        train_idx, test_idx = train_test_split(np.arange(len(target)), 
+                                               train_size=tt_split, stratify=target, random_state=split_seed)
+        
+    else:
+        train_idx, test_idx = train_test_split(np.arange(len(target)), 
+                                               train_size=tt_split, random_state=split_seed)
+    train_labels = target[train_idx]
+    
+    # number of features
+    if nr_features == "auto":
+        nr_features = int(rng.integers(1, np.shape(data)[1]))
+        
+    if binary:
+        train_labels = train_labels.astype(int)
+    else:
+        train_labels = train_labels.astype(float)
+    
+    # the training data is only materialized for selectors which need it
+    if any(m != "fast_mrmr" for m in method):
+        train_data = data[train_idx]
+        # non constant columns
+        col_min, col_max = column_range(train_data)
+        nconst_cols = np.where(col_min != col_max)[0]
+        if len(nconst_cols) < train_data.shape[1]:
+            train_data = train_data[:,nconst_cols]
+    
+    times = {"split": time.perf_counter() - start, "methods": []} if timed else None
+    selected = []
+    for m in method:
+        if timed:
+            start = time.perf_counter()
+        try:
+            if callable(m):
+                ranks = m(train_data, train_labels, nr_features)
+            elif m == "fast_mrmr":
+                selected.append(mrmr_engine.ranks(test_idx, nr_features))
+            elif m in FILTER_METHODS:
+                ranks = filter_ranks(m, train_data, train_labels, nr_features, binary, 
+                                     random_state=split_seed)
+            elif m in ["mRMR", "mrmr"]:
+                # the mrmr package requires dense data
+                mrmr_data = pd.DataFrame(train_data.toarray() if sp.issparse(train_data) else train_data)
+                if binary:
+                    ranks = mrmr.mrmr_classif(mrmr_data, train_labels, 
+                                              nr_features, show_progress=False)
+                    
+                else:
+                    ranks = mrmr.mrmr_regression(mrmr_data, train_labels, 
+                                              nr_features, show_progress=False)
+            if m != "fast_mrmr":
+                selected.append(nconst_cols[np.asarray(ranks, dtype=int)])
+        except Exception as e:
+            selected.append(e)
+        if timed:
+            times["methods"].append(time.perf_counter() - start)
+    return split_seed, selected, times
+
+
+def _run_ga(fitness_fun, population, num_parents_mating, num_generations, random_seed, on_start=None, on_generation=None):
+    """
+    Run the genetic algorithm on a binary initial population.
+    
+    Returns
+    -----
+    The <pygad GA> instance after the run.
+    """
+    ga_instance = GA(num_generations = num_generations,
+               num_parents_mating = num_parents_mating,
+               fitness_func = fitness_fun,
+               fitness_batch_size = population.shape[0],
+               initial_population = population,
+               gene_type=int,
+               gene_space=[0, 1],
+               init_range_high=1,
+               init_range_low=0,
+               random_seed=random_seed,
+               on_start=on_start,
+               on_generation=on_generation
+               )
+    ga_instance.run()
+    return ga_instance
+
+
+def _converged(history, stop_generations, tol):
+    """
+    Check whether the best fitness did not improve by more than ``tol`` (relative) within the last ``stop_generations`` generations.
+    
+    PARAMETERS
+    -----
+    history : <list>
+        Best fitness found so far, one entry per generation.
+    """
+    if (stop_generations is None) or (len(history) <= stop_generations):
+        return False
+    before, now = history[-stop_generations - 1], history[-1]
+    if not np.isfinite(before):
+        return now == before
+    return now - before <= tol * np.abs(before)
+
+
+def _stopping_callback(info, stop_generations, tol, deadline, on_generation=None):
+    """
+    Create a pygad ``on_generation`` callback, which records the number of generations and the best fitness in ``info``, 
+    and stops the GA on convergence or when the wall-clock ``deadline`` (as ``time.time()``) is reached.
+    """
+    history = []
+    
+    def callback(ga_instance):
+        if on_generation is not None:
+            on_generation(ga_instance)
+        best = float(np.max(ga_instance.last_generation_fitness))
+        history.append(max(best, history[-1]) if len(history) > 0 else best)
+        info["generations"] += 1
+        info["best_fitness"] = history[-1]
+        if (deadline is not None) and (time.time() >= deadline):
+            info["stop_reason"] = "time_budget"
+            return "stop"
+        if _converged(history, stop_generations, tol):
+            info["stop_reason"] = "converged"
+            return "stop"
+    return callback
+
+
+def _evolve_island(model, theta, population, num_generations, random_seed, deadline=None, timed=False):
+    """
+    Evolve the population of one island of the island-model GA for a number of generations.
+    
+    Returns
+    -----
+    A <tuple> with the final population, its fitness values, and a <dictionary> with the number of generations, 
+    fitness calls and fitness evaluations. If ``timed``, the dictionary also lists the wall time, 
+    number of fitness evaluations and best fitness per generation (``generation_log``).
+    """
+    info = {"generations": 0, "fitness_calls": 0, "fitness_evaluations": 0, "best_fitness": None, "stop_reason": None}
+    
+    def fitness_fun(ga_instance, solutions, solution_idx):
+        info["fitness_calls"] += 1
+        info["fitness_evaluations"] += np.shape(solutions)[0]
+        return model._fitness(theta, solutions)
+    
+    on_start, on_generation = None, None
+    if timed:
+        info["generation_log"] = []
+        last = {}
+        
+        def on_start(ga_instance):
+            last["time"] = time.perf_counter()
+            last["evaluations"] = info["fitness_evaluations"]
+        
+        def on_generation(ga_instance):
+            now = time.perf_counter()
+            info["generation_log"].append((now - last["time"], info["fitness_evaluations"] - last["evaluations"], 
+                                           float(np.max(ga_instance.last_generation_fitness))))
+            last["time"] = now
+            last["evaluations"] = info["fitness_evaluations"]
+    
+    ga_instance = _run_ga(fitness_fun, population, model.popsize, num_generations, random_seed, on_start=on_start,
+                          on_generation=_stopping_callback(info, None, 0, deadline, on_generation=on_generation))
+    population = ga_instance.population.copy()
+    info["fitness_calls"] += 1
+    info["fitness_evaluations"] += population.shape[0]
+    return population, model._fitness(theta, population), info
+
+
+def _init_island_worker(model, theta):
+    """
+    Store a data-free copy of the UBaymodel and the posterior scores once per worker process of the island pool.
+    """
+    global _worker_island
+    _worker_island = (model, theta)
+
+
+def _island_worker(population, num_generations, random_seed, deadline, timed):
+    """
+    Evolve one island inside a worker process.
+    """
+    return _evolve_island(_worker_island[0], _worker_island[1], population, num_generations, random_seed, deadline, timed)
+
+
+def _train_path_worker(model, theta, config):
+    """
+    Train a data-free copy of a UBaymodel on a single configuration inside a worker process.
+    """
+    model._applyConfig(config)
+    return model._optimize(theta), model.getTrainInfo()
+
+
+def _posterior_inclusions(model, draws):
+    """
+    Train a data-free copy of a UBaymodel for each posterior draw of the feature importances.
+    
+    Returns
+    -----
+    A <numpy array> with the number of draws in which each feature was selected.
+    """
+    inclusions = np.zeros(model.ncol, dtype=np.int64)
+    with np.errstate(divide="ignore"):
+        thetas = np.log(draws)
+    for theta in thetas:
+        inclusions += model._optimize(theta).astype(np.int64)
+    return inclusions
+
+
+def _init_posterior_worker(model):
+    """
+    Store a data-free copy of the UBaymodel once per worker process of the posterior pool.
+    """
+    global _worker_posterior
+    _worker_posterior = model
+
+
+def _posterior_worker(draws):
+    """
+    Train on a chunk of posterior draws inside a worker process.
+    """
+    return _posterior_inclusions(_worker_posterior, draws)
+
+
+def _shareable_data(data):
+    """
+    Describe a memory-mapped array by its file, such that worker processes can map it again instead of receiving a copy.
+    """
+    if isinstance(data, np.memmap) and (data.filename is not None):
+        order = "F" if (data.flags.f_contiguous and not data.flags.c_contiguous) else "C"
+        return ("memmap", data.filename, data.dtype, data.shape, data.offset, order)
+    return data
+
+
+def _init_ensemble_worker(data, target, binary, use_mrmr_engine):
+    """
+    Store the dataset once per worker process of the ensemble pool.
+    """
+    global _worker_data
+    if isinstance(data, tuple):
+        _, filename, dtype, shape, offset, order = data
+        data = np.memmap(filename, dtype=dtype, mode="r", shape=shape, offset=offset, order=order)
+    mrmr_engine = MRMREngine(data, target, binary) if use_mrmr_engine else None
+    _worker_data = (data, target, mrmr_engine)
+
+
+def _ensemble_worker(binary, tt_split, nr_features, method, member_seed, timed):
+    """
+    Fit a single ensemble model inside a worker process.
+    """
+    return _ensemble_member(_worker_data[0], _worker_data[1], binary, tt_split, nr_features, method, member_seed, 
+                            mrmr_engine=_worker_data[2], timed=timed)
+
+
+# version of the file format written by UBaymodel.save
+_FORMAT_VERSION = 1
+
+# memory limit of the standardized data columns cached by UBaymodel.evaluateFS (128 MB)
+_CORRELATION_CACHE_BYTES = 2**27
+
+
+def _prepare_data(data):
+    """
+    Convert the dataset into a single read-only array without copying it, if possible. 
+    Strings are paths to ``.npy`` files, which are memory-mapped.
+    """
+    if isinstance(data, str):
+        data = np.load(data, mmap_mode="r")
+    elif isinstance(data, pd.DataFrame):
+        data = data.to_numpy()
+    if sp.issparse(data):
+        return sp.csr_matrix(data)
+    data = data.view() if isinstance(data, np.ndarray) else np.asarray(data)
+    data.flags.writeable = False
+    return data
+
+
+def _prepare_target(target):
+    """
+    Transform the target to a 1-d numpy array.
+    """
+    target = target.values if isinstance(target, pd.DataFrame) else target
+    return target[:,0] if len(np.shape(target)) == 2 else target
+
+
+def _mmap_npz(path, name):
+    """
+    Memory-map an array stored uncompressed in an ``.npz`` file, without reading it.
+    
+    Returns
+    -----
+    A read-only <numpy memmap>, or a <numpy array> if the array is compressed or empty.
+    """
+    with zipfile.ZipFile(path) as archive:
+        info = archive.getinfo(name + ".npy")
+    with open(path, "rb") as f:
+        # skip the local file header of the zip member
+        f.seek(info.header_offset)
+        header = f.read(30)
+        name_length, extra_length = struct.unpack("<HH", header[26:30])
+        f.seek(info.header_offset + 30 + name_length + extra_length)
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    if (info.compress_type != zipfile.ZIP_STORED) or (np.prod(shape) == 0):
+        with np.load(path) as arrays:
+            return arrays[name]
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape, offset=offset, 
+                     order="F" if fortran_order else "C")
 
 
 class UBaymodel():
@@ -26,9 +375,11 @@ class UBaymodel():
     
     PARAMETERS
     -----
-    data: <numpy array> or <pandas dataframe>
+    data: <numpy array>, <numpy memmap>, <scipy sparse matrix>, <pandas dataframe> or <string>
         Dataset on which feature selection shall be performed. 
-        Variable types must be numeric or integer.
+        Variable types must be numeric or integer. If a string is given, it is the path to a ``.npy`` file, which is memory-mapped.
+        The data is kept as a single read-only array and is not copied, if possible. Sparse data is stored in CSR format; 
+        callable methods receive sparse training data in this case, and the ``mrmr`` method densifies each split (prefer ``fast_mrmr``).
     target: <numpy array> or <pandas dataframe>
         Response variable of data.
         Variable types must be numeric or integer.
@@ -36,19 +387,25 @@ class UBaymodel():
         List holding feature names. Preferably a list of string values. 
         If empty, feature names will be generated automatically. 
         Default: ``feat_names=[]``.
-    M : <int>
+    M : <int> or <string>
         Positive integer determining the number of ensemble models. Default ``M=100``.
+        If ``M="auto"``, ensemble models are added in batches until the posterior scores converge (see ``growEnsembles``).
 	tt_split : <float>
         Ratio of samples used for training a single ensemble model. Default ``tt_split=0.75``.
     nr_features : <string or int>
         Number of features selected in a single ensemble. Default: ``nr_features="auto"``.
-            - ``string="auto"`` : A random number between 1 and the total number of features. 
+            - ``string="auto"`` : A random number between 1 and the total number of features, drawn per ensemble model. 
             - ``int`` : A positive integer.
     method : <list of strings>
         List of feature selectors used as ensemble feature selectors.Currently options are:
             - ``mrmr`` : minimum Redundancy maximal Relevance criterion. This method supports classification and regression tasks.
-            - ``chi`` : chi square whatever
+            - ``fast_mrmr`` : built-in implementation of ``mrmr``, sharing sufficient statistics across the train/test splits. 
+              Recommended for large ``M`` and many features.
+            - ``chi2`` or ``chi`` : chi-square statistic (classification only)
             - ``fisher`` : Fisher score (classification only)
+            - ``mutual_info`` or ``mi`` : mutual information. This method supports classification and regression tasks.
+            - ``f_test`` or ``anova`` : F-statistic. This method supports classification and regression tasks.
+            - a function ``f(X, y, nr_features)`` returning the column indices of the selected features.
     prior_model : <string>
         Type of prior. Default: ``prior_model="dirichlet"``. So far, "dirichlet" is the only implemented prior model type.
     weights : <list>
@@ -58,31 +415,48 @@ class UBaymodel():
     l : <float>
         Positive float. The Lagrange parameter defining the penalization strength imposed on a feature set violating the constraints. Default: ``l=1``
     optim_method : <string>
-        Optimizer. Currently only Genetic Algorithm "GA" available. Default: ``optim_metod="GA"``
+        Optimizer. Default: ``optim_metod="GA"``. Options are:
+            - ``GA`` : Genetic Algorithm.
+            - ``islands`` : Island-model Genetic Algorithm with migration, running the islands in ``n_jobs`` processes (see ``setOptim``).
+            - ``local`` : Simulated annealing with incremental evaluation of single-feature moves, suited for many features.
+            - ``milp`` : Exact mixed-integer linear programming, if all constraints are hard (``rho=Inf``). Otherwise, GA is used.
     popsize : <integer>
         Positive integer for the population size in GA.
     maxiter : <integer>
         Positive integer for the maximal number of GA iterations.     
+    random_state : <int>
+        Seed for reproducibility. Each ensemble model receives its own seed spawned from ``random_state``. Default: ``random_state=None``
+    n_jobs : <int>
+        Number of worker processes used to build the ensemble. ``n_jobs=-1`` uses all available cores. 
+        Results do not depend on ``n_jobs``. Default: ``n_jobs=1``
+    checkpoint_dir : <string>
+        Directory for checkpoints of the ensemble build. Completed ensemble models are written to the directory, and a model 
+        created with the same settings and directory skips them, which gives the same result as an uninterrupted run. 
+        If ``random_state=None``, the seed of the checkpoint is used. Default: ``checkpoint_dir=None``
+    checkpoint_every : <int>
+        Number of ensemble models per checkpoint file. Default: ``checkpoint_every=10``
+    metrics : <UBaymetrics>
+        Collects wall times and call counts of the ensemble build and training, see UBaymetrics. Default: ``metrics=None``
     """
     
     def __init__(self, data, target, feat_names = [], M=100, tt_split=0.75, 
                  nr_features="auto",
                  method=["mrmr"], prior_model="dirichlet", weights=[1], 
                  constraints=None, l=1, optim_method="GA", popsize=100, maxiter=100,
-                 random_state=None):
+                 random_state=None, n_jobs=1, checkpoint_dir=None, checkpoint_every=10, metrics=None):
         
         
-        self.data = pd.DataFrame(data)
-        self.nrow, self.ncol = np.shape(data)
-        target = target.values if isinstance(target, pd.DataFrame) else target
-        self.target = target[:,0] if len(np.shape(target)) == 2 else target # transform target to 1-d nparray
-        self.M = M
+        self.data = _prepare_data(data)
+        self.nrow, self.ncol = np.shape(self.data)
+        self.target = _prepare_target(target)
+        self.M = 0
         self.tt_split = tt_split
         self.method = method
         self.prior_model = prior_model
         self.l = l
         self.random_state = random_state
         self.constraints = []
+        self.setMetrics(metrics)
         self.setWeights(weights)
         self.setOptim(optim_method, popsize, maxiter)
         
@@ -91,12 +465,16 @@ class UBaymodel():
             self.setConstraints(constraints, append=True)
         
         # catch errors
-        if self.data.isnull().values.any():
+        if sp.issparse(self.data):
+            if np.isnan(self.data.data).any():
+                sys.exit("Error: NA values not supported!")
+        elif np.issubdtype(self.data.dtype, np.floating) and \
+            any(np.isnan(self.data[i:(i+1000)]).any() for i in range(0, self.nrow, 1000)):
             sys.exit("Error: NA values not supported!")
-        if len(self.data) != len(self.target):
+        if self.nrow != len(self.target):
             sys.exit("Error: number of labels must match number of data rows!") 
-        if (self.M % 1 != 0) or (self.M <= 0):
-            sys.exit("Error: M must be a positive integer")
+        if (M != "auto") and ((M % 1 != 0) or (M <= 0)):
+            sys.exit("Error: M must be a positive integer or 'auto'")
         if (self.tt_split < 0) or (self.tt_split >1):
             sys.exit("Error: tt_split should not be outs")
         if (self.tt_split < 0.5) or (self.tt_split > 0.99):
@@ -105,10 +483,16 @@ class UBaymodel():
             sys.exit("Error: l must be a positive scalar!")
         if self.l <= 0:
             sys.exit("Error: l must be a positive scalar!")
+        if (n_jobs % 1 != 0) or ((n_jobs <= 0) and (n_jobs != -1)):
+            sys.exit("Error: n_jobs must be a positive integer or -1")
+        if (checkpoint_every % 1 != 0) or (checkpoint_every <= 0):
+            sys.exit("Error: checkpoint_every must be a positive integer")
             
             
         # binary classification or regression
         self.binary = np.array_equal(self.target, self.target.astype(bool))
+        
+        self._checkMethods()
     
         
         
@@ -116,68 +500,264 @@ class UBaymodel():
             self.feat_names = ['f' + str(ind) for ind in range(self.ncol)]
         else:
             self.feat_names = feat_names
-        self.data.columns = self.feat_names
-        self.ensemble_matrix = pd.DataFrame(columns=self.feat_names)
+        self.nr_features = nr_features
+        self.n_jobs = n_jobs
         
-        for i in range(self.M):
-            if self.binary == True:
-                train_data, _, train_labels, _ = train_test_split(self.data, self.target, 
-                                                           train_size=self.tt_split, stratify=self.target, random_state=i)
-                
-            else:
-                train_data, _, train_labels, _ = train_test_split(self.data, self.target, 
-                                                           train_size=self.tt_split, random_state=i)
-            # non constant columns
-            nconst_cols = np.where(train_data.nunique() != 1)[0]
-            self.nconst_cols = nconst_cols
-            train_data = train_data.iloc[:,nconst_cols]
-            self.nconst_feature_names = [self.feat_names[i] for i in nconst_cols]
-            
-            # number of features
-            if nr_features == "auto":
-                seed(self.random_state)
-                self.nr_features = sample(list(np.arange(1,self.ncol)),1)[0]
-            else:
-                self.nr_features = nr_features
-                
-
-            if self.binary:
-                train_labels = train_labels.astype(int)
-            else:
-                train_labels = train_labels.astype(float)
-                
-            for m in self.method:
-                self.ensemble_fails = 0
-                try:
-                    if callable(m):
-                        ranks = m(train_data.values, train_labels, self.nr_features)
-                        ranks = [self.nconst_feature_names[i] for i in ranks]
-                    elif m in ["mRMR", "mrmr"]:
-                        if self.binary:
-                            ranks = mrmr.mrmr_classif(pd.DataFrame(train_data.values), train_labels, 
-                                                      self.nr_features, show_progress=False)
-                            
-                        else:
-                            ranks = mrmr.mrmr_regression(pd.DataFrame(train_data.values), train_labels, 
-                                                      self.nr_features, show_progress=True)
-                        ranks = [self.nconst_feature_names[i] for i in ranks]
-                       
-                        
-                    vec = pd.DataFrame(columns=self.feat_names)
-                    vec.loc[0] = np.repeat(0, self.ncol)
-                    vec.loc[:,ranks] = 1
-                    self.ensemble_matrix = pd.concat([self.ensemble_matrix,
-                                                  vec], ignore_index=False)
-                except:
-                    print("method not working for in this iteration...")
-                    self.ensemble_fails += 1
-                
+        # one independent seed per ensemble model, derived from random_state
+        self.seed_sequence = np.random.SeedSequence(self.random_state)
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_every = int(checkpoint_every)
+        self.checkpoint_members = self._readCheckpoint()
+        self.ensemble_store = np.zeros((0, self.ncol), dtype=np.uint8)
+        self.ensemble_success = np.zeros(0, dtype=bool)
+        self.count_vector = np.zeros(self.ncol, dtype=np.int64)
+        self.ensemble_fails = 0
+        self.mrmr_engine = None
+        self.correlation_cache = OrderedDict()
+        self.reduced = False
+        
+        if M == "auto":
+            self.growEnsembles()
+        else:
+            self.addEnsembles(M)
         
-        if np.ceil(len(self.ensemble_matrix) / len(self.method)) < np.ceil(self.M / 2):
+        if np.ceil(np.sum(self.ensemble_success) / len(self.method)) < np.ceil(self.M / 2):
             sys.exit("Too many ensembles could not be performed!")
         
-        # structure results
-        self.counts = pd.Series(np.sum(self.ensemble_matrix, axis=0))
+    def addEnsembles(self, k):
+        """
+        Add ensemble models to the UBaymodel. Existing ensemble models are kept, 
+        and the new models continue the seed sequence, such that adding models is equivalent to a larger initial ``M``.
+        
+        PARAMETERS
+        -----
+        k : <int>
+            Positive integer determining the number of ensemble models to add.
+        """
+        if (k % 1 != 0) or (k <= 0):
+            sys.exit("Error: k must be a positive integer")
+        if self.data is None:
+            sys.exit("Error: data and target are required to add ensemble models")
+        self._checkMethods()
+        k = int(k)
+        member_seeds = self.seed_sequence.spawn(k)
+        
+        if ("fast_mrmr" in self.method) and (self.mrmr_engine is None):
+            self.mrmr_engine = MRMREngine(self.data, self.target, self.binary)
+        
+        # ensemble models found in the checkpoint are skipped
+        results = [self.checkpoint_members.pop(self.M + i, None) for i in range(k)]
+        todo = [i for i in range(k) if results[i] is None]
+        chunk_size = self.checkpoint_every if self.checkpoint_dir is not None else max(len(todo), 1)
+        timed = self.metrics is not None
+        
+        executor = None
+        if (self.n_jobs != 1) and (len(todo) > 0):
+            max_workers = None if self.n_jobs == -1 else self.n_jobs
+            executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_ensemble_worker,
+                                           initargs=(_shareable_data(self.data), self.target, self.binary, 
+                                                     "fast_mrmr" in self.method))
+        try:
+            for start in range(0, len(todo), chunk_size):
+                chunk = todo[start:(start + chunk_size)]
+                with self._phase("ensemble"):
+                    if executor is None:
+                        chunk_results = [_ensemble_member(self.data, self.target, self.binary, self.tt_split, self.nr_features, 
+                                                          self.method, member_seeds[i], self.mrmr_engine, timed) for i in chunk]
+                    else:
+                        chunk_results = list(executor.map(_ensemble_worker, repeat(self.binary), repeat(self.tt_split),
+                                                          repeat(self.nr_features), repeat(self.method), 
+                                                          [member_seeds[i] for i in chunk], repeat(timed)))
+                for i, member in zip(chunk, chunk_results):
+                    results[i] = member
+                if self.checkpoint_dir is not None:
+                    self._writeCheckpoint([self.M + i for i in chunk], chunk_results)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            # the cached correlation columns are not kept beyond the build
+            self.mrmr_engine = None
+        
+        # extend the ensemble store with one row per (ensemble model, method)
+        errors = {}
+        with self._phase("assembly"):
+            self.ensemble_store = np.vstack([self.ensemble_store, 
+                                             np.zeros((k * len(self.method), self.ncol), dtype=np.uint8)])
+            self.ensemble_success = np.append(self.ensemble_success, np.zeros(k * len(self.method), dtype=bool))
+            for i, (split_seed, member, times) in enumerate(results):
+                self._storeMember(self.M + i, member)
+                for j, selected in enumerate(member):
+                    if isinstance(selected, Exception):
+                        errors.setdefault(j, selected)
+                if (self.metrics is not None) and (times is not None):
+                    self.metrics.add_member(self.M + i, split_seed, times, self._methodNames(), 
+                                            [isinstance(selected, Exception) for selected in member])
+        self.M += k
+        
+        fails = int(np.sum(~self.ensemble_success)) - self.ensemble_fails
+        self.ensemble_fails += fails
+        if fails > 0:
+            print("method not working for in", fails, "ensemble iterations...")
+            for j, e in errors.items():
+                print("Warning: method", self._methodNames()[j], "failed with", type(e).__name__ + ":", e)
+            
+    def _methodNames(self):
+        """
+        Names of the ensemble feature selectors, functions are named ``callable:<function name>``.
+        """
+        return [("callable:" + getattr(m, "__name__", "method")) if callable(m) else m for m in self.method]
+    
+    def _checkpointSettings(self):
+        """
+        Settings which must agree between a checkpoint and the model resuming from it.
+        """
+        return {"format_version": _FORMAT_VERSION, "nrow": int(self.nrow), "ncol": int(self.ncol), 
+                "method": self._methodNames(), "tt_split": float(self.tt_split), 
+                "nr_features": self.nr_features if self.nr_features == "auto" else int(self.nr_features),
+                "entropy": str(self.seed_sequence.entropy)}
+    
+    def _readCheckpoint(self):
+        """
+        Read the completed ensemble models from the checkpoint directory, or create the directory.
+        
+        Returns
+        -----
+        A <dictionary> mapping the index of each completed ensemble model to its split seed and selected features.
+        """
+        if self.checkpoint_dir is None:
+            return {}
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        settings_path = os.path.join(self.checkpoint_dir, "checkpoint.json")
+        
+        if os.path.exists(settings_path):
+            with open(settings_path) as f:
+                saved = json.load(f)
+            if self.random_state is None:
+                self.seed_sequence = np.random.SeedSequence(int(saved["entropy"]))
+            if saved != self._checkpointSettings():
+                sys.exit("Error: checkpoint in " + str(self.checkpoint_dir) + " does not match the model settings")
+        else:
+            with open(settings_path, "w") as f:
+                json.dump(self._checkpointSettings(), f)
+        
+        members = {}
+        for path in sorted(glob.glob(os.path.join(self.checkpoint_dir, "members_*.npz"))):
+            with np.load(path) as chunk:
+                for r, (i, j) in enumerate(zip(chunk["member"], chunk["method"])):
+                    _, selected, _ = members.setdefault(int(i), (int(chunk["split_seed"][r]), [None] * len(self.method), None))
+                    if chunk["success"][r]:
+                        selected[j] = chunk["indices"][chunk["offsets"][r]:chunk["offsets"][r+1]]
+        return members
+    
+    def _writeCheckpoint(self, member_indices, results):
+        """
+        Write completed ensemble models to a new file in the checkpoint directory.
+        """
+        rows = [(i, j, split_seed, selected) for i, (split_seed, member, _) in zip(member_indices, results) 
+                for j, selected in enumerate(member)]
+        success = [(selected is not None) and (not isinstance(selected, Exception)) for _, _, _, selected in rows]
+        indices = [np.asarray(row[3], dtype=np.int64) if ok else np.zeros(0, dtype=np.int64) for row, ok in zip(rows, success)]
+        
+        path = os.path.join(self.checkpoint_dir, "members_%08d.npz" % member_indices[0])
+        # write to a temporary file first, such that an interrupted write does not leave a broken checkpoint
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, member=np.array([row[0] for row in rows], dtype=np.int64),
+                     method=np.array([row[1] for row in rows], dtype=np.int64),
+                     split_seed=np.array([row[2] for row in rows], dtype=np.int64),
+                     success=np.array(success, dtype=bool),
+                     indices=np.concatenate([np.zeros(0, dtype=np.int64)] + indices),
+                     offsets=np.concatenate([[0], np.cumsum([len(ind) for ind in indices])]).astype(np.int64))
+        os.replace(path + ".tmp", path)
+        
+    def growEnsembles(self, batch_size=10, tol=1e-3, max_M=1000, top_k=None):
+        """
+        Add batches of ensemble models until the posterior scores converge.
+        
+        PARAMETERS
+        -----
+        batch_size : <int>
+            Number of ensemble models added per batch. Default: ``batch_size=10``
+        tol : <float>
+            Convergence tolerance on the maximal absolute change of the posterior expectation (on probability scale) between two batches. Default: ``tol=1e-3``
+        max_M : <int>
+            Maximal total number of ensemble models. Default: ``max_M=1000``
+        top_k : <int>
+            If given, convergence is reached when the set of the ``top_k`` features with the highest posterior expectation 
+            does not change between two batches, instead of using ``tol``. Default: ``top_k=None``
+    
+        Returns
+        -----
+        The number of ensemble models ``M`` after growing.
+        """
+        if (batch_size % 1 != 0) or (batch_size <= 0):
+            sys.exit("Error: batch_size must be a positive integer")
+        
+        previous = np.exp(self.posteriorExpectation()) if self.M > 0 else None
+        while self.M < max_M:
+            self.addEnsembles(min(batch_size, max_M - self.M))
+            current = np.exp(self.posteriorExpectation())
+            if previous is not None:
+                if top_k is not None:
+                    converged = set(np.argsort(-previous, kind="stable")[:top_k]) == \
+                        set(np.argsort(-current, kind="stable")[:top_k])
+                else:
+                    converged = np.max(np.abs(current - previous)) < tol
+                if converged:
+                    break
+            previous = current
+        return self.M
+        
+    def _checkMethods(self):
+        """
+        Check that all ensemble feature selectors are known and suitable for the task.
+        """
+        for m in self.method:
+            if not (callable(m) or (m in FILTER_METHODS) or (m in ["mRMR", "mrmr", "fast_mrmr"])):
+                sys.exit("Error: unknown method " + str(m))
+            if (not callable(m)) and (FILTER_METHODS.get(m) in CLASSIFICATION_METHODS) and (not self.binary):
+                sys.exit("Error: method " + m + " supports classification tasks only")
+    
+    @property
+    def ensemble_store(self):
+        """
+        Binary ensemble store as <numpy array>, one row per ensemble model and method. 
+        Models loaded from disk keep the bit-packed store memory-mapped and unpack it on first access.
+        """
+        if self._ensemble_store is None:
+            self._ensemble_store = np.unpackbits(self.ensemble_packed, axis=1, count=self.ncol)
+        return self._ensemble_store
+    
+    @ensemble_store.setter
+    def ensemble_store(self, value):
+        self._ensemble_store = value
+        self.ensemble_packed = None
+    
+    @property
+    def ensemble_matrix(self):
+        """
+        Binary ensemble matrix as <pandas dataframe>, one row per successful ensemble model and method. 
+        """
+        if self.ensemble_success.all():
+            return pd.DataFrame(self.ensemble_store, columns=self.feat_names, copy=False)
+        return pd.DataFrame(self.ensemble_store[self.ensemble_success], columns=self.feat_names)
+    
+    @property
+    def counts(self):
+        """
+        Number of ensemble models selecting each feature as <pandas series>. 
+        """
+        return pd.Series(self.count_vector, index=self.feat_names)
+    
+    def _storeMember(self, member_index, member):
+        """
+        Write the results of one ensemble model into the ensemble store and update the counts.
+        """
+        for j, selected in enumerate(member):
+            if (selected is not None) and (not isinstance(selected, Exception)):
+                row = member_index * len(self.method) + j
+                self.ensemble_store[row, selected] = 1
+                self.ensemble_success[row] = True
+                self.count_vector += self.ensemble_store[row]
         
         
     def setWeights(self, weights, block_list=None, block_matrix=None):
@@ -229,23 +809,89 @@ class UBaymodel():
     
     
                 
-    def setOptim(self, optim_method, popsize, maxiter):
+    def setOptim(self, optim_method, popsize, maxiter, cache_size=0, islands=4, migration_interval=10, migration_size=1,
+                 stop_generations=None, tol=0, time_budget=None, temperature=0.01, polish=False, reduce=False, 
+                 screen=None):
         """
         Set parameters for optimization.
     
         PARAMETERS
         -----
         optim_method : <string>
-            Currently only genetic algorithm ("GA") possible.
+            Genetic algorithm ("GA"), island-model genetic algorithm ("islands"), simulated annealing ("local") or 
+            mixed-integer linear programming ("milp", hard constraints only).
         popsize : <integer>
-            Positive integer for the population size in GA.
+            Positive integer for the population size in GA (per island).
         maxiter : <integer>
             Positive integer for the maximal number of GA iterations.     
+        cache_size : <integer>
+            Maximal number of fitness values kept in a least-recently-used cache, shared by ``train`` and ``evaluateFS``. 
+            ``cache_size=0`` disables the cache. Default: ``cache_size=0``
+        islands : <integer>
+            Number of islands (populations) of the island-model GA. The islands run in ``n_jobs`` processes. Default: ``islands=4``
+        migration_interval : <integer>
+            Number of generations between two migrations of the island-model GA. Default: ``migration_interval=10``
+        migration_size : <integer>
+            Number of best feature sets migrating from each island to the next. Default: ``migration_size=1``
+        stop_generations : <integer>
+            Stop the GA early if the best fitness did not improve within ``stop_generations`` generations. 
+            ``stop_generations=None`` disables early stopping. Default: ``stop_generations=None``
+        tol : <float>
+            Relative improvement of the best fitness below which it counts as no improvement for ``stop_generations``. Default: ``tol=0``
+        time_budget : <float>
+            Wall-clock budget of ``train`` in seconds; the best feature set found so far is returned when it is exceeded. 
+            Checked once per generation (per migration for islands), and as time limit for milp. 
+            ``time_budget=None`` means no limit. Default: ``time_budget=None``
+        temperature : <float>
+            Initial temperature of the simulated annealing ("local"), on the scale of the log-utility. 
+            The temperature decreases linearly to 0 over ``maxiter * popsize`` moves. Default: ``temperature=0.01``
+        polish : <boolean>
+            If True, the result of "GA" or "islands" is improved by a local search (simulated annealing at temperature 0), 
+            which stops after ``popsize * stop_generations`` moves without improvement (``10 * popsize`` if ``stop_generations=None``). 
+            Default: ``polish=False``
+        reduce : <boolean>
+            If True, features linked by hard must-link constraints are collapsed into a single variable, and features 
+            which cannot be selected without violating a hard constraint are removed before optimization. 
+            The optimizer runs on the reduced problem and the result is mapped back to the features. Default: ``reduce=False``
+        screen : <integer>
+            If given, the optimizer only considers the ``screen`` features with the highest posterior scores and all features 
+            named in a constraint, which makes the optimization cost independent of the total number of features. 
+            The result is optimal for the full problem if ``screen`` is at least the hard max-size; otherwise a warning is 
+            printed. ``screen=None`` disables the screening. Default: ``screen=None``
         """
-        # check if method is empty
+        if optim_method not in ["GA", "islands", "local", "milp"]:
+            sys.exit("Error: unknown optim_method")
+        if (cache_size % 1 != 0) or (cache_size < 0):
+            sys.exit("Error: cache_size must be a non-negative integer")
+        if (islands % 1 != 0) or (islands <= 0) or (migration_interval % 1 != 0) or (migration_interval <= 0):
+            sys.exit("Error: islands and migration_interval must be positive integers")
+        if (migration_size % 1 != 0) or (migration_size < 0) or (migration_size > popsize):
+            sys.exit("Error: migration_size must be an integer between 0 and popsize")
+        if (stop_generations is not None) and ((stop_generations % 1 != 0) or (stop_generations <= 0)):
+            sys.exit("Error: stop_generations must be a positive integer or None")
+        if tol < 0:
+            sys.exit("Error: tol must be non-negative")
+        if (time_budget is not None) and (time_budget <= 0):
+            sys.exit("Error: time_budget must be positive or None")
+        if temperature < 0:
+            sys.exit("Error: temperature must be non-negative")
+        if (screen is not None) and ((screen % 1 != 0) or (screen < 0)):
+            sys.exit("Error: screen must be a non-negative integer or None")
         self.optim_method = optim_method
         self.popsize = popsize
         self.maxiter = maxiter
+        self.cache_size = int(cache_size)
+        self.islands = int(islands)
+        self.migration_interval = int(migration_interval)
+        self.migration_size = int(migration_size)
+        self.stop_generations = None if stop_generations is None else int(stop_generations)
+        self.tol = tol
+        self.time_budget = time_budget
+        self.temperature = temperature
+        self.polish = bool(polish)
+        self.reduce = bool(reduce)
+        self.screen = None if screen is None else int(screen)
+        self.clearCache()
         
     def getOptim(self):
         """
@@ -255,7 +901,61 @@ class UBaymodel():
         -----
         A dictionary with the optimization parameters.
         """
-        return {"optim_method":self.optim_method, "popsize":self.popsize, "maxiter":self.maxiter}
+        return {"optim_method":self.optim_method, "popsize":self.popsize, "maxiter":self.maxiter, 
+                "cache_size":self.cache_size, "islands":self.islands, "migration_interval":self.migration_interval, 
+                "migration_size":self.migration_size, "stop_generations":self.stop_generations, 
+                "tol":self.tol, "time_budget":self.time_budget, "temperature":self.temperature, "polish":self.polish, 
+                "reduce":self.reduce, "screen":self.screen}
+    
+    def clearCache(self):
+        """
+        Empty the fitness cache and reset its counters.
+        """
+        self.fitness_cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_theta = None
+        self.cache_l = None
+        
+    def getCacheInfo(self):
+        """
+        Get statistics of the fitness cache.
+    
+        Returns
+        -----
+        A dictionary with the number of cache hits and misses, the current number of entries and the maximal cache size.
+        """
+        return {"hits":self.cache_hits, "misses":self.cache_misses, 
+                "size":len(self.fitness_cache), "cache_size":self.cache_size}
+        
+    def setMetrics(self, metrics):
+        """
+        Attach a metrics object collecting wall times and call counts.
+    
+        PARAMETERS
+        -----
+        metrics : <UBaymetrics>
+            Metrics object, see UBaymetrics. ``metrics=None`` disables the instrumentation.
+        """
+        if (metrics is not None) and (not isinstance(metrics, UBaymetrics)):
+            sys.exit("Error: metrics must be a UBaymetrics object or None")
+        self.metrics = metrics
+        
+    def getMetrics(self):
+        """
+        Get the metrics object.
+    
+        Returns
+        -----
+        A <UBaymetrics> object or None.
+        """
+        return self.metrics
+    
+    def _phase(self, name):
+        """
+        Context manager timing a phase, if metrics are attached.
+        """
+        return nullcontext() if self.metrics is None else self.metrics.phase(name)
         
     def setConstraints(self, constraints, append=False):
         """
@@ -271,15 +971,17 @@ class UBaymodel():
         """
         if constraints.get_dimensions()[1] != self.ncol:
             sys.exit("Dimensions of constraints do not match")
+        self.clearCache()
         
         if append:
             # check if block matrix already present
-            bm_appearance = [np.array_equal(constraints.block_matrix, i.block_matrix) for i in self.constraints]
+            bm_appearance = [same_matrix(constraints.block_matrix, i.block_matrix) for i in self.constraints]
             if sum(bm_appearance) > 0:
-                index = int(np.where(bm_appearance)[0])
-                self.constraints[index].A = np.append(self.constraints[index].A, constraints.A, axis=0)
+                index = int(np.where(bm_appearance)[0][0])
+                self.constraints[index].A = sp.vstack([self.constraints[index].A, constraints.A], format="csr")
                 self.constraints[index].b = np.append(self.constraints[index].b, constraints.b)
                 self.constraints[index].rho = np.append(self.constraints[index].rho, constraints.rho)
+                self.constraints[index].compile()
             else:
                 self.constraints = self.constraints + [constraints]
         else:
@@ -302,12 +1004,13 @@ class UBaymodel():
         -----
         state : <np.array>
             Binary 1-d array indicating which features are selected (1) and which are not selected (0).
+            Alternatively, a binary 2-d array with one feature set per row.
         log : <boolean>
             Use of log-scale.
     
         Returns
         -----
-        A numeric value.
+        A numeric value, or a <numpy array> with one value per row if state is 2-dimensional.
         """
         adm = 1-log
         for i in self.constraints:
@@ -328,6 +1031,137 @@ class UBaymodel():
         post_scores = self.counts.values.astype(int) + self.weights
         post_scores = np.log(post_scores) - np.log(np.sum(post_scores))
         return post_scores
+    
+    def samplePosterior(self, n_samples, chunk_size=None, random_state=None):
+        """
+        Draw feature importances from the Dirichlet posterior with parameters counts + weights. 
+        The draws are generated in chunks, such that only one chunk is held in memory.
+    
+        PARAMETERS
+        -----
+        n_samples : <integer>
+            Number of posterior draws.
+        chunk_size : <integer>
+            Number of draws per chunk. If None, chunks hold about 2^22 values (32 MB). Default: ``chunk_size=None``
+        random_state : <int>
+            Seed of the draws. If None, the seed of the model is used. Default: ``random_state=None``
+    
+        Returns
+        -----
+        A generator of <numpy arrays> with one draw per row; each row sums to 1.
+        """
+        if (n_samples % 1 != 0) or (n_samples <= 0):
+            sys.exit("Error: n_samples must be a positive integer")
+        if chunk_size is None:
+            chunk_size = max(1, 2**22 // self.ncol)
+        elif (chunk_size % 1 != 0) or (chunk_size <= 0):
+            sys.exit("Error: chunk_size must be a positive integer or None")
+        
+        alpha = self.counts.values.astype(float) + np.ravel(self.weights)
+        rng = np.random.default_rng(self.random_state if random_state is None else random_state)
+        return self._dirichletChunks(alpha, int(n_samples), int(chunk_size), rng)
+    
+    @staticmethod
+    def _dirichletChunks(alpha, n_samples, chunk_size, rng):
+        """
+        Generator of the Dirichlet draws of ``samplePosterior``; the arguments are checked before the first draw.
+        """
+        tiny = np.finfo(float).tiny
+        for start in range(0, n_samples, chunk_size):
+            # normalized Gamma variables are Dirichlet distributed
+            draws = rng.standard_gamma(alpha, size=(min(chunk_size, n_samples - start), len(alpha)))
+            draws /= np.sum(draws, axis=1, keepdims=True)
+            # keep the log-scores finite for features with tiny weights
+            yield np.maximum(draws, tiny)
+    
+    def posteriorStability(self, n_samples=1000, level=0.95, optimize=False, chunk_size=None, n_jobs=1, random_state=None):
+        """
+        Posterior uncertainty of the feature importances and of the selected feature set. 
+        The credible intervals of the importances are exact, since the marginals of the Dirichlet posterior 
+        are Beta(alpha_j, sum(alpha) - alpha_j) with alpha = counts + weights. The inclusion frequency of a feature 
+        is the fraction of posterior draws (see ``samplePosterior``) in which the feature is selected.
+    
+        PARAMETERS
+        -----
+        n_samples : <integer>
+            Number of posterior draws. Default: ``n_samples=1000``
+        level : <float>
+            Level of the equal-tailed credible intervals. Default: ``level=0.95``
+        optimize : <boolean>
+            - True: The feature set is optimized for each draw with the optimization settings of the model (see ``setOptim``, 
+              a fast optimizer such as "local" or "milp", possibly with ``screen``, is recommended).
+            - False: The max-size features with the highest importances are selected in each draw, ignoring other constraints.
+            Default: ``optimize=False``
+        chunk_size : <integer>
+            Number of draws per chunk, see ``samplePosterior``. Default: ``chunk_size=None``
+        n_jobs : <int>
+            Number of worker processes optimizing the draws if ``optimize=True``. Results do not depend on ``n_jobs``. 
+            ``n_jobs=-1`` uses all available cores. Default: ``n_jobs=1``
+        random_state : <int>
+            Seed of the draws. If None, the seed of the model is used. Default: ``random_state=None``
+    
+        Returns
+        -----
+        A <pandas dataframe> with the feature names as index and columns: posterior mean of the importance, lower and upper 
+        limit of its credible interval, inclusion frequency, and lower and upper limit of the credible interval of the 
+        inclusion probability (Jeffreys interval; the lower limit is 0 if a feature is never selected, 
+        and the upper limit is 1 if it is always selected).
+        """
+        if (level <= 0) or (level >= 1):
+            sys.exit("Error: level must be in (0,1)")
+        if (n_jobs % 1 != 0) or ((n_jobs <= 0) and (n_jobs != -1)):
+            sys.exit("Error: n_jobs must be a positive integer or -1")
+        if len(self.constraints) == 0:
+            sys.exit("At least a max-size constraint must be present for training!")
+        if not optimize:
+            ms = [const.get_maxsize() for const in self.constraints if const.get_maxsize() is not None]
+            if len(ms) != 1:
+                sys.exit("No max-size constraint!")
+            ms = int(min(ms[0], self.ncol))
+        
+        alpha = self.counts.values.astype(float) + np.ravel(self.weights)
+        quantiles = [(1 - level) / 2, (1 + level) / 2]
+        inclusions = np.zeros(self.ncol, dtype=np.int64)
+        
+        with self._phase("posterior sampling"):
+            draws = self.samplePosterior(n_samples, chunk_size=chunk_size, random_state=random_state)
+            if not optimize:
+                for chunk in draws:
+                    if ms > 0:
+                        top = np.argpartition(-chunk, ms - 1, axis=1)[:, :ms]
+                        inclusions += np.bincount(top.ravel(), minlength=self.ncol)
+            elif n_jobs == 1:
+                model = self._lightCopy()
+                for chunk in draws:
+                    inclusions += _posterior_inclusions(model, chunk)
+            else:
+                max_workers = os.cpu_count() if n_jobs == -1 else n_jobs
+                # at most two chunks per worker are held in memory
+                with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_posterior_worker, 
+                                         initargs=(self._lightCopy(),)) as executor:
+                    pending = set()
+                    for chunk in draws:
+                        if len(pending) >= 2 * max_workers:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                inclusions += future.result()
+                        pending.add(executor.submit(_posterior_worker, chunk))
+                    for future in pending:
+                        inclusions += future.result()
+        
+        # Jeffreys interval, with the limits set to 0 (1) if a feature is never (always) included
+        inclusion_lower = np.where(inclusions == 0, 0., 
+                                   beta.ppf(quantiles[0], inclusions + 0.5, n_samples - inclusions + 0.5))
+        inclusion_upper = np.where(inclusions == n_samples, 1., 
+                                   beta.ppf(quantiles[1], inclusions + 0.5, n_samples - inclusions + 0.5))
+        
+        return pd.DataFrame({"mean": alpha / np.sum(alpha),
+                             "lower": beta.ppf(quantiles[0], alpha, np.sum(alpha) - alpha),
+                             "upper": beta.ppf(quantiles[1], alpha, np.sum(alpha) - alpha),
+                             "inclusion frequency": inclusions / n_samples,
+                             "inclusion lower": inclusion_lower,
+                             "inclusion upper": inclusion_upper},
+                            index=self.feat_names)
         
         
     def train(self):
@@ -344,27 +1178,752 @@ class UBaymodel():
             sys.exit("At least a max-size constraint must be present for training!")
         
         
+        with self._phase("train"):
+            theta = self.posteriorExpectation()
+            x_optim = self._optimize(theta)
+        
+        return  pd.DataFrame(x_optim, index=self.feat_names), list(np.array(self.feat_names)[np.where(x_optim ==1)[0]])
+    
+    def train_path(self, configs, warm_start=True, n_jobs=1, method="spearman"):
+        """
+        Train the UBaymodel for a sequence of configurations of constraints, Lagrange parameter and optimizer settings, 
+        reusing the ensemble. The posterior scores are computed once. The model itself is not modified.
+        
+        PARAMETERS
+        -----
+        configs : <list> of <dictionaries>
+            Configurations with any of the keys 
+                - ``constraints`` : a <UBayconstraint> or a <list> of UBayconstraints, replacing the present constraints
+                - ``l`` : Lagrange parameter
+                - ``optim_method``, ``popsize``, ``maxiter``, ... : optimization parameters, see ``setOptim``
+            Settings which are not given are taken from the model.
+        warm_start : <boolean>
+            If True, the best admissible feature sets of the final population of the previous configuration replace 
+            up to half of the initial population drawn by ``sampleInitial`` (see ``_warmStart``). 
+            Only used if ``n_jobs=1``. Default: ``warm_start=True``
+        n_jobs : <int>
+            Number of worker processes training the configurations independently; the data is not sent to the workers. 
+            ``n_jobs=-1`` uses all available cores. Default: ``n_jobs=1``
+        method : <string>
+            Correlation method passed to ``evaluateFS``. Default: ``method="spearman"``
+    
+        Returns
+        -----
+        A <pandas dataframe> with one row per configuration: the Lagrange parameter, the max-size, the selected features, 
+        the number of GA generations and stopping reason (see ``getTrainInfo``) and the output of ``evaluateFS``.
+        """
+        if (n_jobs % 1 != 0) or ((n_jobs <= 0) and (n_jobs != -1)):
+            sys.exit("Error: n_jobs must be a positive integer or -1")
+        
         theta = self.posteriorExpectation()
+        models = []
+        for config in configs:
+            model = copy.copy(self)
+            model._applyConfig(config)
+            if len(model.constraints) == 0:
+                sys.exit("At least a max-size constraint must be present for training!")
+            models.append(model)
         
-        def fitness_fun(ga_instance, solution, solution_idx):
-            return logsumexp(np.array(list(theta[solution==1]) + [np.log(self.l) + self.admissibility(solution)]))
+        if n_jobs == 1:
+            states = []
+            infos = []
+            population = None
+            for model in models:
+                with model._phase("train"):
+                    if (population is not None) and np.isfinite(model.admissibility(population)).any():
+                        states.append(model._optimize(theta, x_start=model._warmStart(theta, population)))
+                    else:
+                        states.append(model._optimize(theta))
+                infos.append(model.getTrainInfo())
+                population = getattr(model, "last_population", None) if warm_start else None
+        else:
+            max_workers = None if n_jobs == -1 else n_jobs
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                states, infos = zip(*executor.map(_train_path_worker, repeat(self._lightCopy()), repeat(theta), configs))
         
-        x_start = self.sampleInitial(post_scores = np.exp(theta), size=self.popsize)
-        ga_instance = GA(num_generations = self.maxiter,
-                   num_parents_mating = self.popsize,
-                   fitness_func = fitness_fun,
-                   initial_population = x_start,
-                   gene_type=int,
-                   init_range_high=1,
-                   init_range_low=0,
-                   random_seed=self.random_state
-                   )
+        rows = []
+        for i, (model, state, info) in enumerate(zip(models, states, infos)):
+            ms = [const.get_maxsize() for const in model.constraints if const.get_maxsize() is not None]
+            rows.append({"config": i, "l": model.l, "max_size": ms[0] if len(ms) == 1 else None, 
+                         "selected": list(np.array(self.feat_names)[np.where(state == 1)[0]]),
+                         "generations": info["generations"], "stop_reason": info["stop_reason"],
+                         **model.evaluateFS(np.asarray(state), method=method)})
+        return pd.DataFrame(rows).set_index("config")
+    
+    def _warmStart(self, theta, population):
+        """
+        Initial population of ``train_path`` combining the final population of the previous configuration with 
+        ``sampleInitial``: the best admissible feature sets of the previous population (at most half of the population) 
+        replace sampled feature sets; the best-scores feature set of ``sampleInitial`` is always kept.
         
-        x_optim, x_optim_fitness, _ = ga_instance.best_solution()
+        Returns
+        -----
+        A binary <numpy array> with one feature set per row.
+        """
+        with self._phase("initialization"):
+            x_start = self.sampleInitial(post_scores = np.exp(theta), size=self.popsize)
+        population = np.unique(population[np.isfinite(self.admissibility(population))], axis=0)
+        keep = min(len(population), (self.popsize + 1) // 2, x_start.shape[0] - 1)
+        if keep > 0:
+            best = np.argsort(-self._fitness(theta, population), kind="stable")[:keep]
+            x_start[:keep] = population[best]
+        return x_start
+    
+    def _applyConfig(self, config):
+        """
+        Set constraints, Lagrange parameter and optimization parameters from a configuration of ``train_path``.
+        """
+        unknown = set(config) - ({"constraints", "l"} | set(self.getOptim()))
+        if len(unknown) > 0:
+            sys.exit("Error: unknown configuration keys " + str(sorted(unknown)))
         
+        if "constraints" in config:
+            constraints = config["constraints"]
+            constraints = constraints if isinstance(constraints, list) else [constraints]
+            self.constraints = []
+            for const in constraints:
+                # copies, as appending merges constraints with the same block matrix in place
+                self.setConstraints(copy.deepcopy(const), append=True)
+        if "l" in config:
+            if not ((isinstance(config["l"], (int, float))) and (config["l"] > 0)):
+                sys.exit("Error: l must be a positive scalar!")
+            self.l = config["l"]
+        optim = self.getOptim()
+        if any((key in config) and (config[key] != optim[key]) for key in optim):
+            optim.update({key: config[key] for key in optim if key in config})
+            self.setOptim(**optim)
+        else:
+            self.clearCache()
+    
+    def _lightCopy(self):
+        """
+        Copy of the UBaymodel without data and ensemble store, which can be sent to worker processes for training.
+        """
+        model = copy.copy(self)
+        model.data = None
+        model.target = None
+        model.mrmr_engine = None
+        model.metrics = None
+        model.n_jobs = 1
+        model.correlation_cache = OrderedDict()
+        model.checkpoint_members = {}
+        model._ensemble_store = np.zeros((0, self.ncol), dtype=np.uint8)
+        model.ensemble_packed = None
+        model.clearCache()
+        return model
+    
+    def _optimize(self, theta, x_start=None):
+        """
+        Optimize the utility function for given posterior scores with the selected optimizer.
         
-        return  pd.DataFrame(x_optim, index=self.feat_names), list(np.array(self.feat_names)[np.where(x_optim ==1)[0]])
+        Returns
+        -----
+        A binary <numpy array> with the optimal feature set.
+        """
+        start = time.time()
+        deadline = None if self.time_budget is None else start + self.time_budget
+        self.train_info = {"optim_method": self.optim_method, "generations": 0, "fitness_evaluations": 0, 
+                           "best_fitness": None, "stop_reason": "maxiter", "seconds": None}
+        
+        if (self.screen is not None) and (self.screen < self.ncol):
+            x_optim = self._trainScreened(theta, x_start=x_start, deadline=deadline)
+        elif self.reduce:
+            x_optim = self._trainReduced(theta, x_start=x_start, deadline=deadline)
+        elif self.optim_method == "milp":
+            x_optim = self._trainMILP(theta, deadline=deadline)
+        elif self.optim_method == "islands":
+            x_optim = self._trainIslands(theta, deadline=deadline)
+        elif self.optim_method == "local":
+            x_optim = self._trainLocal(theta, x_start=x_start, deadline=deadline)
+        else:
+            x_optim = self._trainGA(theta, x_start=x_start, deadline=deadline)
+        
+        subproblem = self.reduce or ((self.screen is not None) and (self.screen < self.ncol))
+        if self.polish and (not subproblem) and (self.optim_method in ["GA", "islands"]):
+            stop_reason = self.train_info["stop_reason"]
+            stop_steps = self.popsize * (10 if self.stop_generations is None else self.stop_generations)
+            x_optim = self._trainLocal(theta, x_start=np.atleast_2d(x_optim), deadline=deadline, 
+                                       temperature=0, stop_steps=stop_steps)
+            if self.train_info["stop_reason"] != "time_budget":
+                self.train_info["stop_reason"] = stop_reason
+        
+        self.train_info["best_fitness"] = float(self._evaluateFitness(theta, np.atleast_2d(x_optim))[0])
+        self.train_info["seconds"] = time.time() - start
+        return x_optim
+    
+    def _reduceProblem(self, theta):
+        """
+        Reduce the optimization problem before training. Features linked by hard must-link constraints (rho = Inf, 
+        in both directions) are collapsed into one variable per connected component. Components which violate a hard 
+        constraint whenever they are selected (e.g. larger than the max-size, or containing two features of a hard cannot-link) 
+        are removed. Constraint rows which can never be violated in the reduced problem are dropped.
+        
+        Returns
+        -----
+        A <tuple> with the reduced <UBaymodel> (without data), the sparse mapping matrix P (features x components) 
+        with state = P * reduced state, and the log-scaled posterior scores of the components.
+        """
+        n = self.ncol
+        
+        # hard must-link rows x_a - x_b <= 0 of constraints without block structure
+        edges = [np.zeros((0, 2), dtype=int)]
+        for const in self.constraints:
+            if not const.identity_block:
+                continue
+            A = const.A
+            rows = np.where((np.diff(A.indptr) == 2) & (const.rho == np.inf) & (const.b == 0))[0]
+            start = A.indptr[rows]
+            cols = np.column_stack([A.indices[start], A.indices[start + 1]])
+            vals = np.column_stack([A.data[start], A.data[start + 1]])
+            forward = (vals[:,0] == 1) & (vals[:,1] == -1)
+            backward = (vals[:,0] == -1) & (vals[:,1] == 1)
+            edges += [cols[forward], cols[backward][:,::-1]]
+        edges = np.vstack(edges).astype(np.int64)
+        # features are equal only if linked in both directions
+        both = edges[np.isin(edges[:,0] * n + edges[:,1], edges[:,1] * n + edges[:,0])]
+        graph = sp.csr_matrix((np.ones(len(both)), (both[:,0], both[:,1])), shape=(n, n))
+        num_components, labels = connected_components(graph, directed=False)
+        P = sp.csr_matrix((np.ones(n), (np.arange(n), labels)), shape=(n, num_components))
+        
+        # remove components violating a hard constraint for any choice of the remaining features
+        feasible = np.ones(num_components, dtype=bool)
+        for const in self.constraints:
+            hard = np.where(const.rho == np.inf)[0]
+            if len(hard) == 0:
+                continue
+            A = const.A[hard]
+            blocks_on = P if const.identity_block else ((const.block_matrix @ P) != 0).astype(float)
+            # minimal left-hand side: positive coefficients of the component plus all negative coefficients
+            lhs = (A.maximum(0) @ blocks_on).tocoo()
+            threshold = const.b[hard] - np.asarray(A.minimum(0).sum(axis=1)).ravel()
+            feasible[lhs.col[lhs.data > threshold[lhs.row]]] = False
+        P = P[:,np.where(feasible)[0]].tocsr()
+        reduced = self._subproblem(P)
+        return reduced, P, np.log(P.transpose() @ np.exp(theta))
+    
+    def _subproblem(self, P):
+        """
+        Copy of the UBaymodel without data for the optimization over feature sets ``state = P * y``, where the sparse 
+        binary matrix P (features x variables) assigns each feature to at most one variable. Constraint rows which 
+        can never be violated are dropped.
+        
+        Returns
+        -----
+        A <UBaymodel> with one feature per column of P.
+        """
+        m = P.shape[1]
+        constraints = []
+        for const in self.constraints:
+            if const.identity_block:
+                A = (const.A @ P).tocsr()
+                block_matrix = sp.identity(m, format="csr")
+                max_lhs = np.asarray(A.maximum(0).sum(axis=1)).ravel()
+            else:
+                A = const.A
+                block_matrix = (const.block_matrix @ P).tocsr()
+                nonempty = np.diff(block_matrix.indptr) > 0
+                max_lhs = np.asarray(A.maximum(0) @ nonempty.astype(float)).ravel()
+            keep = np.where(max_lhs > const.b)[0]
+            if len(keep) > 0:
+                constraints.append(UBayconstraint(rho=const.rho[keep], A=A[keep], b=const.b[keep], 
+                                                  block_matrix=block_matrix))
+        
+        model = self._lightCopy()
+        model.ncol = m
+        P_csc = sp.csc_matrix(P)
+        names = np.array(self.feat_names)
+        model.feat_names = ["+".join(names[P_csc.indices[P_csc.indptr[c]:P_csc.indptr[c+1]]]) for c in range(m)]
+        model.count_vector = P.transpose() @ self.count_vector
+        model.weights = P.transpose() @ np.ravel(self.weights)
+        model.block_matrix = None
+        model._ensemble_store = np.zeros((0, m), dtype=np.uint8)
+        model.constraints = constraints
+        model.reduce = False
+        model.screen = None
+        model.reduced = True
+        model.metrics = self.metrics
+        model.last_population = None
+        model.clearCache()
+        return model
+    
+    def _trainReduced(self, theta, x_start=None, deadline=None):
+        """
+        Optimize the reduced problem (see ``_reduceProblem``) and map the result back to the features. 
+        Feature sets outside the reduced problem violate a hard constraint and have a utility of at most the utility of 
+        the full feature set, which is therefore compared with the result.
+        
+        Returns
+        -----
+        A binary <numpy array> with the optimal feature set.
+        """
+        with self._phase("reduction"):
+            reduced, P, theta_reduced = self._reduceProblem(theta)
+        info = {"reduced_features": P.shape[1], "pruned_features": int(self.ncol - P.nnz),
+                "constraint_rows": sum(len(const.b) for const in self.constraints),
+                "reduced_constraint_rows": sum(len(const.b) for const in reduced.constraints)}
+        return self._trainSubproblem(theta, reduced, P, theta_reduced, info, x_start=x_start, deadline=deadline)
+    
+    def _screenFeatures(self, theta):
+        """
+        Screen the features for training: the ``screen`` features with the highest posterior scores are kept, together 
+        with all features named in a constraint. A constraint row with equal coefficients for all features of a group 
+        without block structure (such as the max-size) names no feature, since it only depends on the number of selected features. 
+        
+        The screened problem contains an optimal feature set if the number of kept features not named in any constraint 
+        is at least the hard max-size s: every admissible feature set selecting a removed feature selects at most s - 1 
+        other features, so the removed feature can be exchanged for an unselected kept feature with a higher score, 
+        which leaves all constraints unchanged. Inadmissible feature sets are dominated by the full feature set.
+        
+        Returns
+        -----
+        A <tuple> with the sorted indices of the kept features and a <boolean> indicating whether the screening is exact.
+        """
+        n = self.ncol
+        named = np.zeros(n, dtype=bool)
+        max_size = np.inf
+        for const in self.constraints:
+            A = const.A
+            if const.identity_block:
+                # coefficients of the rows covering all features, one row each
+                full = np.where(np.diff(A.indptr) == n)[0]
+                coefficients = A[full].data.reshape(len(full), n)
+                uniform_rows = full[np.all(coefficients == coefficients[:,:1], axis=1)]
+                uniform = np.zeros(A.shape[0], dtype=bool)
+                uniform[uniform_rows] = True
+                named[A[np.where(~uniform)[0]].indices] = True
+                coefficient = np.zeros(A.shape[0])
+                coefficient[full] = coefficients[:,0]
+                hard_size = uniform & (const.rho == np.inf) & (coefficient > 0)
+                if np.any(hard_size):
+                    max_size = min(max_size, np.min(np.floor(const.b[hard_size] / coefficient[hard_size])))
+            else:
+                # any feature in a block can change the number of selected blocks
+                named[np.diff(sp.csc_matrix(const.block_matrix).indptr) > 0] = True
+        
+        free = np.where(~named)[0]
+        k = min(self.screen, len(free))
+        top = free[np.argpartition(-theta[free], k - 1)[:k]] if k > 0 else free[:0]
+        return np.sort(np.concatenate([np.where(named)[0], top])), bool(k >= max_size)
+    
+    def _trainScreened(self, theta, x_start=None, deadline=None):
+        """
+        Optimize over the screened features (see ``_screenFeatures``) and map the result back to the features. 
+        The result is compared with the full feature set.
+        
+        Returns
+        -----
+        A binary <numpy array> with the optimal feature set.
+        """
+        with self._phase("screening"):
+            kept, exact = self._screenFeatures(theta)
+            P = sp.csr_matrix((np.ones(len(kept)), (kept, np.arange(len(kept)))), shape=(self.ncol, len(kept)))
+            screened = self._subproblem(P)
+            screened.reduce = self.reduce
+        if not exact:
+            print("Warning: screening may exclude the optimal feature set, since fewer than max-size unconstrained features are kept. "
+                  "Increase screen.")
+        info = {"screened_features": len(kept), "screen_exact": exact}
+        return self._trainSubproblem(theta, screened, P, theta[kept], info, x_start=x_start, deadline=deadline)
+    
+    def _trainSubproblem(self, theta, model, P, theta_sub, info, x_start=None, deadline=None):
+        """
+        Optimize a subproblem created by ``_subproblem`` and map the result back to the features. The result is compared 
+        with the full feature set, which dominates all inadmissible feature sets.
+        
+        Returns
+        -----
+        A binary <numpy array> with the optimal feature set.
+        """
+        if len(model.constraints) == 0:
+            y_optim = np.ones(P.shape[1], dtype=int)
+        else:
+            if x_start is not None:
+                # feature sets selecting complete variables only
+                sizes = np.diff(P.tocsc().indptr)
+                x_start = (np.transpose(P.transpose() @ np.transpose(x_start)) == sizes).astype(int)
+            if deadline is not None:
+                model.time_budget = max(deadline - time.time(), 1e-6)
+            y_optim = model._optimize(theta_sub, x_start=x_start)
+            info = {**model.getTrainInfo(), **info}
+        
+        x_optim = (P @ y_optim > 0).astype(int)
+        x_full = np.ones((1, self.ncol), dtype=int)
+        if self._evaluateFitness(theta, x_full)[0] > self._evaluateFitness(theta, np.atleast_2d(x_optim))[0]:
+            x_optim = x_full[0]
+        self.train_info.update(info)
+        self.last_population = getattr(model, "last_population", None)
+        if self.last_population is not None:
+            self.last_population = np.transpose(P @ np.transpose(self.last_population) > 0).astype(int)
+        return x_optim
+    
+    def getTrainInfo(self):
+        """
+        Get diagnostics of the last optimization run by ``train``.
+    
+        Returns
+        -----
+        A dictionary with the optimizer, the number of GA generations and fitness evaluations actually used, 
+        the fitness of the returned feature set, the reason for stopping 
+        ("maxiter", "converged", "time_budget", or "optimal" for milp) and the wall time in seconds. 
+        If ``reduce=True``, also the number of variables of the reduced problem, the number of removed features, 
+        and the number of constraint rows before and after the reduction. 
+        If ``screen`` is set, also the number of screened features and whether the screening is exact.
+        """
+        return dict(getattr(self, "train_info", {}))
+    
+    def _trainGA(self, theta, x_start=None, deadline=None):
+        """
+        Optimize the utility function with a genetic algorithm.
+        
+        PARAMETERS
+        -----
+        x_start : <numpy array>
+            Initial population, one feature set per row. If None, the population is drawn by ``sampleInitial``.
+        deadline : <float>
+            Wall-clock time (``time.time()``) at which the GA is stopped. Default: ``deadline=None``
+        
+        Returns
+        -----
+        A binary <numpy array> with the optimal feature set.
+        """
+        info = self.train_info
+        
+        def fitness_fun(ga_instance, solutions, solution_idx):
+            info["fitness_evaluations"] += np.shape(solutions)[0]
+            return self._fitness(theta, solutions)
+        
+        if x_start is None:
+            with self._phase("initialization"):
+                x_start = self.sampleInitial(post_scores = np.exp(theta), size=self.popsize)
+        on_start, on_generation = (None, None) if self.metrics is None else self.metrics.generation_callbacks()
+        on_generation = _stopping_callback(info, self.stop_generations, self.tol, deadline, on_generation)
+        with self._phase("GA"):
+            ga_instance = _run_ga(fitness_fun, x_start, self.popsize, self.maxiter, self.random_state, 
+                                  on_start=on_start, on_generation=on_generation)
+        self.last_population = ga_instance.population.copy()
+        
+        x_optim, x_optim_fitness, _ = ga_instance.best_solution(ga_instance.last_generation_fitness)
+        return x_optim
+    
+    def _trainLocal(self, theta, x_start=None, deadline=None, temperature=None, stop_steps=None):
+        """
+        Optimize the utility function by simulated annealing with incremental evaluation of single-feature moves (see LocalSearch). 
+        The search performs ``maxiter * popsize`` moves, starting from the best feature set of the initial population.
+        
+        PARAMETERS
+        -----
+        x_start : <numpy array>
+            Initial population, one feature set per row. If None, the population is drawn by ``sampleInitial``.
+        deadline : <float>
+            Wall-clock time (``time.time()``) at which the search is stopped. Default: ``deadline=None``
+        temperature : <float>
+            Initial temperature. If None, the ``temperature`` of ``setOptim`` is used. Default: ``temperature=None``
+        stop_steps : <int>
+            Number of moves without improvement after which the search stops. If None, ``popsize * stop_generations`` is used.
+        
+        Returns
+        -----
+        A binary <numpy array> with the optimal feature set.
+        """
+        info = self.train_info
+        if x_start is None:
+            with self._phase("initialization"):
+                x_start = self.sampleInitial(post_scores = np.exp(theta), size=self.popsize)
+        fitness = self._fitness(theta, x_start)
+        info["fitness_evaluations"] += x_start.shape[0]
+        
+        if temperature is None:
+            temperature = self.temperature
+        if (stop_steps is None) and (self.stop_generations is not None):
+            stop_steps = self.popsize * self.stop_generations
+        
+        with self._phase("local search"):
+            search = LocalSearch(theta, self.l, self.constraints, x_start[np.argmax(fitness)])
+            x_optim, _, moves, stop_reason = search.anneal(self.maxiter * self.popsize, temperature, 
+                                                           np.random.default_rng(self.random_state), deadline=deadline, 
+                                                           stop_steps=stop_steps, tol=self.tol)
+        info["fitness_evaluations"] += moves
+        info["stop_reason"] = stop_reason
+        return x_optim
+    
+    def _trainIslands(self, theta, deadline=None):
+        """
+        Optimize the utility function with an island-model genetic algorithm. Each island evolves its own population, 
+        drawn by ``sampleInitial``, and the ``migration_size`` best feature sets of each island replace the worst feature sets 
+        of the next island (ring topology) every ``migration_interval`` generations. 
+        The islands run in ``n_jobs`` worker processes; results do not depend on ``n_jobs``. 
+        Convergence (``stop_generations``, ``tol``) is checked at each migration.
+        
+        Returns
+        -----
+        A binary <numpy array> with the optimal feature set.
+        """
+        with self._phase("initialization"):
+            x_start = self.sampleInitial(post_scores = np.exp(theta), size=self.islands * self.popsize)
+        # every island receives its own sampled feature sets and the best-scores feature set
+        populations = [np.vstack([x_start[(i * self.popsize):((i + 1) * self.popsize)], x_start[-1]]).astype(int) 
+                       for i in range(self.islands)]
+        island_seeds = np.random.SeedSequence(self.random_state).spawn(self.islands)
+        info = self.train_info
+        history = []
+        timed = self.metrics is not None
+        run = self.metrics.new_run() if timed else None
+        
+        executor = None
+        if self.n_jobs != 1:
+            max_workers = self.islands if self.n_jobs == -1 else min(self.n_jobs, self.islands)
+            executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_island_worker,
+                                           initargs=(self._lightCopy(), theta))
+        try:
+            with self._phase("GA"):
+                for start in range(0, self.maxiter, self.migration_interval):
+                    num_generations = min(self.migration_interval, self.maxiter - start)
+                    seeds = [int(seed.spawn(1)[0].generate_state(1)[0]) for seed in island_seeds]
+                    if executor is None:
+                        results = [_evolve_island(self, theta, pop, num_generations, seed, deadline, timed) 
+                                   for pop, seed in zip(populations, seeds)]
+                    else:
+                        results = list(executor.map(_island_worker, populations, repeat(num_generations), seeds, 
+                                                    repeat(deadline), repeat(timed)))
+                        if timed:
+                            # the worker copies have no metrics, fitness calls are counted here
+                            self.metrics.add_fitness(sum(island_info["fitness_evaluations"] for _, _, island_info in results),
+                                                     calls=sum(island_info["fitness_calls"] for _, _, island_info in results))
+                    populations = [pop for pop, _, _ in results]
+                    fitness = [fit for _, fit, _ in results]
+                    generations = max(island_info["generations"] for _, _, island_info in results)
+                    info["generations"] += generations
+                    info["fitness_evaluations"] += sum(island_info["fitness_evaluations"] for _, _, island_info in results)
+                    history += [max([np.max(fit) for fit in fitness] + history[-1:])] * generations
+                    if timed:
+                        for g in range(generations):
+                            logs = [island_info["generation_log"][g] for _, _, island_info in results 
+                                    if len(island_info["generation_log"]) > g]
+                            self.metrics.add_generation(run, info["generations"] - generations + g + 1, 
+                                                        sum(log[0] for log in logs), sum(log[1] for log in logs), 
+                                                        max(log[2] for log in logs))
+                    
+                    if (deadline is not None) and (time.time() >= deadline):
+                        info["stop_reason"] = "time_budget"
+                        break
+                    if _converged(history, self.stop_generations, self.tol):
+                        info["stop_reason"] = "converged"
+                        break
+                    
+                    # ring migration of the best feature sets
+                    if (self.islands > 1) and (self.migration_size > 0) and (start + num_generations < self.maxiter):
+                        migrants = [pop[np.argsort(-fit, kind="stable")[:self.migration_size]] 
+                                    for pop, fit in zip(populations, fitness)]
+                        for i in range(self.islands):
+                            target = (i + 1) % self.islands
+                            worst = np.argsort(fitness[target], kind="stable")[:self.migration_size]
+                            populations[target][worst] = migrants[i]
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        
+        best_island = int(np.argmax([np.max(fit) for fit in fitness]))
+        x_optim = populations[best_island][np.argmax(fitness[best_island])]
+        self.last_population = np.vstack(populations)
+        return x_optim
+    
+    def _trainMILP(self, theta, deadline=None):
+        """
+        Optimize the utility function exactly by mixed-integer linear programming. 
+        If all constraints are hard (rho = Inf), the admissibility is either 0 or 1, and maximizing the utility 
+        over admissible feature sets is equivalent to maximizing the sum of posterior scores subject to A * state <= b.
+        Block states are modeled by additional binary variables y with y_k = max_j {x_j : feature j in block k}.
+        Inadmissible feature sets have a utility of at most the utility of the full feature set, which is therefore 
+        compared with the result (it is optimal if no feature set is admissible, or if l is small). 
+        Falls back to the genetic algorithm if any constraint is soft or the solver fails.
+        
+        Returns
+        -----
+        A binary <numpy array> with the optimal feature set.
+        """
+        if any(np.any(const.rho != np.inf) for const in self.constraints):
+            print("Warning: milp requires hard constraints (rho=Inf) only, using GA instead")
+            return self._trainGA(theta, deadline=deadline)
+        
+        n = self.ncol
+        rows = []
+        ub = []
+        num_vars = n
+        for const in self.constraints:
+            if const.identity_block:
+                rows.append(sp.hstack([const.A, sp.csr_matrix((const.A.shape[0], num_vars - n))]))
+                ub.append(const.b)
+            else:
+                # block indicators y: x_j <= y_k for j in block k, y_k <= sum_j x_j, and A * y <= b
+                block = (const.block_matrix > 0).astype(float).tocoo()
+                nb = block.shape[0]
+                offset = num_vars
+                num_vars += nb
+                
+                link1 = sp.csr_matrix((np.concatenate([np.ones(block.nnz), -np.ones(block.nnz)]),
+                                       (np.tile(np.arange(block.nnz), 2), np.concatenate([block.col, offset + block.row]))),
+                                      shape=(block.nnz, num_vars))
+                link2 = sp.hstack([-block.tocsr(), sp.csr_matrix((nb, offset - n)), sp.identity(nb)])
+                constr = sp.hstack([sp.csr_matrix((const.A.shape[0], offset)), const.A])
+                rows += [link1, link2, constr]
+                ub += [np.zeros(block.nnz), np.zeros(nb), const.b]
+        
+        rows = sp.vstack([sp.hstack([r, sp.csr_matrix((r.shape[0], num_vars - r.shape[1]))]) for r in rows], format="csr")
+        c = np.concatenate([-np.exp(theta), np.zeros(num_vars - n)])
+        options = {} if deadline is None else {"time_limit": max(deadline - time.time(), 0)}
+        with self._phase("milp"):
+            res = milp(c, constraints=LinearConstraint(rows, -np.inf, np.concatenate(ub)),
+                       integrality=np.ones(num_vars), bounds=Bounds(0, 1), options=options)
+        
+        x_full = np.ones((1, n), dtype=int)
+        full_fitness = self._evaluateFitness(theta, x_full)[0]
+        # status 2: no admissible feature set
+        if res.status == 2:
+            self.train_info["stop_reason"] = "optimal"
+            return x_full[0]
+        if res.x is None:
+            print("Warning: milp failed (" + res.message + "), using GA instead")
+            return self._trainGA(theta, deadline=deadline)
+        
+        x_optim = np.round(res.x[:n]).astype(int)
+        # status 1: time limit reached, the best feature set found so far is returned; 
+        # the full feature set is still optimal if it beats the upper bound of all admissible feature sets
+        bound = getattr(res, "mip_dual_bound", None)
+        optimal = (res.status == 0) or ((bound is not None) and np.isfinite(bound) and 
+                                        (full_fitness >= np.log(max(-bound, 0) + self.l)))
+        if full_fitness > self._evaluateFitness(theta, x_optim[np.newaxis,:])[0]:
+            x_optim = x_full[0]
+        else:
+            optimal = res.status == 0
+        self.train_info["stop_reason"] = "optimal" if optimal else "time_budget"
+        return x_optim
+        
+    def _fitness(self, theta, states):
+        """
+        Log-utility of a batch of feature sets, used as fitness in the optimization.
         
+        PARAMETERS
+        -----
+        theta : <numpy array>
+            Log-scaled posterior scores of the features.
+        states : <numpy array>
+            Binary 2-d array with one feature set per row.
+        
+        Returns
+        -----
+        A <numpy array> with one fitness value per row.
+        """
+        states = np.atleast_2d(states)
+        if self.metrics is not None:
+            self.metrics.add_fitness(states.shape[0])
+        if self.cache_size == 0:
+            return self._evaluateFitness(theta, states)
+        
+        # cached values are only valid for the same posterior scores and Lagrange parameter
+        if (self.cache_l != self.l) or (self.cache_theta is None) or (not np.array_equal(self.cache_theta, theta)):
+            self.clearCache()
+            self.cache_theta = np.array(theta, copy=True)
+            self.cache_l = self.l
+        
+        keys = [key.tobytes() for key in np.packbits(states == 1, axis=1)]
+        fitness = np.empty(len(keys))
+        missing = []
+        for i, key in enumerate(keys):
+            value = self.fitness_cache.get(key)
+            if value is None:
+                missing.append(i)
+            else:
+                fitness[i] = value
+                self.fitness_cache.move_to_end(key)
+        self.cache_hits += len(keys) - len(missing)
+        self.cache_misses += len(missing)
+        
+        if len(missing) > 0:
+            fitness[missing] = self._evaluateFitness(theta, states[missing])
+            for i in missing:
+                self.fitness_cache[keys[i]] = fitness[i]
+            while len(self.fitness_cache) > self.cache_size:
+                self.fitness_cache.popitem(last=False)
+        return fitness
+    
+    def _evaluateFitness(self, theta, states):
+        """
+        Evaluate the log-utility of a batch of feature sets without cache.
+        """
+        utilities = np.column_stack((np.where(states == 1, theta, -np.inf), 
+                                     np.log(self.l) + self.admissibility(states)))
+        return logsumexp(utilities, axis=1)
+    
+    def _greedyFeatureSets(self, feature_orders, constraint_active):
+        """
+        Greedily add features in the given orders as long as all active constraints remain fulfilled.
+        The residuals b - A * state are kept for all feature sets and only updated in the constraints 
+        touched by the added feature.
+        
+        PARAMETERS
+        -----
+        feature_orders : <numpy array>
+            2-d integer array with one feature order per row.
+        constraint_active : <list> of <numpy array>
+            For each constraint group, a binary 2-d array (one row per feature set) indicating the active constraints.
+        
+        Returns
+        -----
+        A binary 2-d <numpy array> with one feature set per row.
+        """
+        size, n = feature_orders.shape
+        x = np.zeros((size, n))
+        rows = np.arange(size)
+        
+        groups = []
+        for const, active in zip(self.constraints, constraint_active):
+            residual = np.tile(const.b, (size, 1))
+            groups.append({"A_t": const.A.transpose().tocsr(),
+                           "block_t": None if const.identity_block else const.block_matrix.transpose().tocsr(),
+                           "block_on": np.zeros((size, const.block_matrix.shape[0]), dtype=bool),
+                           "residual": residual,
+                           "active": active,
+                           "violated": np.sum(active & (residual < 0), axis=1)})
+        
+        for i in range(n):
+            features = feature_orders[:, i]
+            num_violated = np.zeros(size)
+            updates = []
+            for g in groups:
+                # blocks newly switched on by adding the feature
+                if g["block_t"] is None:
+                    new = ~g["block_on"][rows, features]
+                    new_blocks = sp.coo_matrix((np.ones(np.sum(new)), (rows[new], features[new])), 
+                                               shape=g["block_on"].shape)
+                    delta = g["A_t"][features[new]].tocoo()
+                    delta.row = rows[new][delta.row]
+                else:
+                    new_blocks = g["block_t"][features].tocoo()
+                    new = ~g["block_on"][new_blocks.row, new_blocks.col]
+                    new_blocks = sp.coo_matrix((np.ones(np.sum(new)), (new_blocks.row[new], new_blocks.col[new])), 
+                                               shape=g["block_on"].shape)
+                    delta = (new_blocks.tocsr() @ g["A_t"]).tocoo()
+                    delta.sum_duplicates()
+                
+                # change in the number of violated active constraints
+                old_res = g["residual"][delta.row, delta.col]
+                new_res = old_res - delta.data
+                active = g["active"][delta.row, delta.col]
+                change = (active & (new_res < 0)).astype(int) - (active & (old_res < 0)).astype(int)
+                violated = g["violated"] + np.bincount(delta.row, weights=change, minlength=size)
+                num_violated += violated
+                updates.append((new_blocks, delta, new_res, violated))
+            
+            feasible = num_violated == 0
+            x[rows[feasible], features[feasible]] = 1
+            for g, (new_blocks, delta, new_res, violated) in zip(groups, updates):
+                keep = feasible[new_blocks.row]
+                g["block_on"][new_blocks.row[keep], new_blocks.col[keep]] = True
+                keep = feasible[delta.row]
+                g["residual"][delta.row[keep], delta.col[keep]] = new_res[keep]
+                g["violated"] = np.where(feasible, violated, g["violated"])
+        return x
+    
     def sampleInitial(self, post_scores, size):
         """
         Sample an initial feature set based on a search heuristic.
@@ -374,59 +1933,16 @@ class UBaymodel():
         A binary <numpy array> feature set.
         """
         n = len(post_scores)
-        num_constraints_per_block = [const.get_dimensions()[0] for const in self.constraints]
-        cum_num_constraints_per_block = np.array([0] + list(np.cumsum(num_constraints_per_block)))
-        rho = np.concatenate([const.rho for const in self.constraints])
-        rho = 1 / (1 + rho)
+        rng = np.random.default_rng(self.random_state)
         
-        def full_admissibility(state, constraint_dropout, log=True):
-            
-            active_constraints = np.where(constraint_dropout == 1)[0]
-            res = 1-log
-            
-            for i in range(len(self.constraints)):
-                
-                active_constraints_in_block = \
-                    active_constraints[np.where([np.sum(j >= cum_num_constraints_per_block) == (i+1) for j in active_constraints])[0]] - \
-                    cum_num_constraints_per_block[i]
-                
-                if len(active_constraints_in_block) > 0:
-                    constraint_new = UBayconstraint(rho=self.constraints[i].rho[active_constraints_in_block],
-                                                    A=self.constraints[i].A[active_constraints_in_block,:],
-                                                    b=self.constraints[i].b[active_constraints_in_block],
-                                                    block_matrix=self.constraints[i].block_matrix)
-                        
-                    a = constraint_new.group_admissibility(state, log=log)
-                    res = res + a if log else res * a
-            return res
-          
-        
-        def order_features(order):
-            
-            rho_mat = np.column_stack((rho, 1-rho))
-            constraint_dropout = np.array([])
-            for i in range(rho_mat.shape[0]):
-                probs = rho_mat[i,:]
-                constraint_dropout = np.append(constraint_dropout, \
-                                               [np.random.choice([0,1],size=1,replace=True,p=probs)[0]])
-            
-            x = np.zeros(n)
-            for i in range(n):
-                x_new = x.copy()
-                x_new[order[i]] = 1
-                if full_admissibility(state=x_new, constraint_dropout=constraint_dropout,log=False) == 1:
-                    x = x_new             
-            return x
+        # weighted sampling of feature orders without replacement for all feature sets at once:
+        # sorting exponential keys scaled by the scores is equivalent to successive weighted draws
+        feature_orders = np.argsort(rng.exponential(size=(size, n)) / post_scores, axis=1)
         
-        # apply along feature_orders
+        # constraint dropout: constraint j is active with probability rho_j / (1 + rho_j)
+        constraint_active = [rng.random((size, len(const.rho))) >= 1 / (1 + const.rho) for const in self.constraints]
         
-        feature_orders = []
-        seed(self.random_state) 
-        for i in range((size)):
-            feature_orders.append(np.random.choice(range(self.ncol), size=self.ncol, replace=False, p=post_scores))
-    
-        feature_orders = np.transpose(np.stack(feature_orders)) 
-        x_start = np.transpose(np.apply_along_axis(order_features, 0, feature_orders))
+        x_start = self._greedyFeatureSets(feature_orders, constraint_active)
         
         
         # always add feature set with best scores
@@ -444,6 +1960,13 @@ class UBaymodel():
             add_x[ms_sel] = 1
             x_start = np.vstack([x_start, add_x])
             self.x_start = x_start
+        elif self.reduced:
+            # in a subproblem of reduce or screen, the max-size constraint is weighted (collapsed features) 
+            # or dropped (never violated): add the feature set greedily built from the best scores instead
+            add_x = self._greedyFeatureSets(np.argsort(-post_scores)[np.newaxis,:], 
+                                            [np.ones((1, len(const.rho)), dtype=bool) for const in self.constraints])
+            x_start = np.vstack([x_start, add_x])
+            self.x_start = x_start
         else:
             sys.exit("No max-size constraint!")
             
@@ -452,49 +1975,232 @@ class UBaymodel():
         
     def evaluateFS(self, state, method="spearman", log=False):
         """
-        Train the UBaymodel.
+        Evaluate a feature set or a batch of feature sets.
+        
+        PARAMETERS
+        -----
+        state : <numpy array>
+            Binary 1-d array indicating which features are selected (1) and which are not selected (0).
+            Alternatively, a binary 2-d array with one feature set per row.
+        method : <string>
+            Correlation method: "pearson", "spearman" or "kendall". For "pearson" and "spearman", the standardized 
+            (ranked) columns are cached, such that repeated evaluations do not process the data again. Default: ``method="spearman"``
+        log : <boolean>
+            Use of log-scale.
            
         Returns
         -----
-        A <dictionary> with different key parameters of the selected feature set.
+        A <dictionary> with different key parameters of the selected feature set, 
+        or a <pandas dataframe> with one row per feature set if state is 2-dimensional.
         """
-        results = {}
-        # correlation
-        if np.sum(state) >1:
-            c = np.abs(self.data.iloc[:,state==1].corr(method=method)).values
-            average_feature_correlation = np.round((np.sum(c) - np.sum(np.diag(c))) / (np.sum(state) * (np.sum(state)-1)),3)
-        else:
-            c = None
-            average_feature_correlation = None
+        single = (np.ndim(state) == 1)
+        states = np.atleast_2d(np.asarray(state))
+        cardinality = np.sum(states == 1, axis=1)
         
+        # correlation
+        average_feature_correlation = [None] * states.shape[0]
+        multiple = np.where(cardinality > 1)[0]
+        if (len(multiple) > 0) and (self.data is not None):
+            if method in ["pearson", "spearman"]:
+                # absolute correlations between all features used by any feature set, computed at once
+                cols = np.where(np.any(states[multiple] == 1, axis=0))[0]
+                z = self._standardizedColumns(cols, method)
+                c = np.abs(np.transpose(z) @ z) / (self.nrow - 1)
+                positions = np.full(self.ncol, -1)
+                positions[cols] = np.arange(len(cols))
+                for i in multiple:
+                    sel = positions[states[i] == 1]
+                    c_sel = c[np.ix_(sel, sel)]
+                    average_feature_correlation[i] = np.round((np.sum(c_sel) - np.sum(np.diag(c_sel))) / 
+                                                              (cardinality[i] * (cardinality[i] - 1)), 3)
+            else:
+                for i in multiple:
+                    selected_data = self.data[:,np.where(states[i]==1)[0]]
+                    if sp.issparse(selected_data):
+                        selected_data = selected_data.toarray()
+                    c = np.abs(pd.DataFrame(selected_data).corr(method=method)).values
+                    average_feature_correlation[i] = np.round((np.sum(c) - np.sum(np.diag(c))) / 
+                                                              (cardinality[i] * (cardinality[i] - 1)), 3)
         
         # posterior scores
         post_scores = self.posteriorExpectation()
         
-        log_post = logsumexp(post_scores[state == 1]) if any(state == 1) else -np.Inf
-
-        neg_loss = np.exp(logsumexp(np.array(list(post_scores[state==1]) + [np.log(self.l) + self.admissibility(state, log=True)]))) - \
-            self.l
-        if log:
-            neg_loss = np.log(neg_loss)
+        log_post = np.array([logsumexp(post_scores[s == 1]) if np.any(s == 1) else -np.inf for s in states])
+        with np.errstate(divide="ignore"):
+            neg_loss = np.exp(self._fitness(post_scores, states)) - self.l
+            if log:
+                neg_loss = np.log(neg_loss)
             
         # calculate number of violated constraints
-        num_violated_constraints = 0
+        num_violated_constraints = np.zeros(states.shape[0], dtype=int)
         for constraint in self.constraints:
-            num_violated_constraints +=  \
-            np.sum(np.matmul(constraint.A, np.matmul(constraint.block_matrix, state)>0) > constraint.b)
+            block_states = ((constraint.block_matrix @ np.transpose(states)) > 0).astype(float)
+            num_violated_constraints += np.sum(constraint.A @ block_states > constraint.b.reshape(-1,1), axis=0)
             
         # calculate output metrics
-        results["cardinality"] = np.sum(state)
-        results["total utility"] = np.round(neg_loss,3)
-        results["posterior feature utility"] = np.round(log_post, 3) if log else np.round(np.exp(log_post),3)
-        results["admissibility"] = np.round(self.admissibility(state,log=log),3)
-        results["number of violated constraints"] = num_violated_constraints
-        results["average feature correlation"] = average_feature_correlation
-        
+        results = pd.DataFrame({"cardinality": cardinality,
+                                "total utility": np.round(neg_loss,3),
+                                "posterior feature utility": np.round(log_post, 3) if log else np.round(np.exp(log_post),3),
+                                "admissibility": np.round(self.admissibility(states,log=log),3),
+                                "number of violated constraints": num_violated_constraints,
+                                "average feature correlation": pd.Series(average_feature_correlation, dtype=object)})
+        if single:
+            return {key: values[0] for key, values in results.items()}
         return results
-                   
-                
-                    
-                    
-        
\ No newline at end of file
+    
+    def _standardizedColumns(self, cols, method):
+        """
+        Standardized columns of the data (ranked for ``method="spearman"``), such that the correlation matrix of columns 
+        is their cross-product divided by ``nrow - 1``. The most recently used columns are kept in ``correlation_cache``, 
+        one entry per method and column, up to ``_CORRELATION_CACHE_BYTES``.
+        
+        Returns
+        -----
+        A 2-d <numpy array> with one column per entry of ``cols``.
+        """
+        cache = self.correlation_cache
+        max_columns = max(1, _CORRELATION_CACHE_BYTES // (8 * self.nrow))
+        z = np.empty((self.nrow, len(cols)))
+        missing = []
+        for i, j in enumerate(cols):
+            key = (method, int(j))
+            if key in cache:
+                cache.move_to_end(key)
+                z[:,i] = cache[key]
+            else:
+                missing.append(i)
+        
+        if len(missing) > 0:
+            x = self.data[:,cols[missing]]
+            x = x.toarray() if sp.issparse(x) else np.asarray(x, dtype=float)
+            if method == "spearman":
+                x = rankdata(x, axis=0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                z[:,missing] = (x - np.mean(x, axis=0)) / np.std(x, axis=0, ddof=1)
+            for i in missing:
+                cache[(method, int(cols[i]))] = z[:,i].copy()
+                if len(cache) > max_columns:
+                    cache.popitem(last=False)
+        return z
+    
+    def save(self, path):
+        """
+        Save the UBaymodel to a single uncompressed ``.npz`` file. The file contains the bit-packed ensemble store, the counts, 
+        prior weights, feature names, constraints and the provenance of the ensemble (seed sequence, methods and settings), 
+        but not the data.
+    
+        PARAMETERS
+        -----
+        path : <string>
+            File path. The name is used as given, no suffix is appended.
+        """
+        methods = self._methodNames()
+        meta = {"format_version": _FORMAT_VERSION, 
+                "nrow": int(self.nrow), "ncol": int(self.ncol), "M": int(self.M), 
+                "method": methods, "tt_split": float(self.tt_split), 
+                "nr_features": self.nr_features if self.nr_features == "auto" else int(self.nr_features),
+                "prior_model": self.prior_model, "l": float(self.l), "binary": bool(self.binary), 
+                "random_state": None if self.random_state is None else int(self.random_state),
+                "entropy": str(self.seed_sequence.entropy), 
+                "n_children_spawned": int(self.seed_sequence.n_children_spawned),
+                "ensemble_fails": int(self.ensemble_fails), 
+                "optim": self.getOptim(), "num_constraints": len(self.constraints)}
+        
+        arrays = {"meta": np.array(json.dumps(meta)),
+                  "ensemble_packed": np.packbits(self.ensemble_store, axis=1),
+                  "ensemble_success": self.ensemble_success,
+                  "count_vector": self.count_vector,
+                  "weights": np.asarray(self.weights, dtype=float),
+                  "feat_names": np.array([str(f) for f in self.feat_names])}
+        if self.block_matrix is not None:
+            arrays["block_matrix"] = np.asarray(self.block_matrix, dtype=float)
+        for k, constraint in enumerate(self.constraints):
+            for name, matrix in [("A", constraint.A), ("block_matrix", constraint.block_matrix)]:
+                matrix = sp.csr_matrix(matrix)
+                arrays["constraint%d_%s_data" % (k, name)] = matrix.data
+                arrays["constraint%d_%s_indices" % (k, name)] = matrix.indices
+                arrays["constraint%d_%s_indptr" % (k, name)] = matrix.indptr
+                arrays["constraint%d_%s_shape" % (k, name)] = np.array(matrix.shape)
+            arrays["constraint%d_b" % k] = constraint.b
+            arrays["constraint%d_rho" % k] = constraint.rho
+        
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+    
+    @classmethod
+    def load(cls, path, data=None, target=None, method=None, n_jobs=1):
+        """
+        Load a UBaymodel saved with ``save``. The bit-packed ensemble store is memory-mapped and only unpacked 
+        if the ensemble matrix is accessed; counts, weights and constraints are sufficient for ``train``.
+    
+        PARAMETERS
+        -----
+        path : <string>
+            File path of the saved model.
+        data : <numpy array>, <numpy memmap>, <scipy sparse matrix>, <pandas dataframe> or <string>
+            Dataset of the model. Only required to add ensemble models or to compute feature correlations in ``evaluateFS``. 
+            Default: ``data=None``
+        target : <numpy array> or <pandas dataframe>
+            Response variable of data. Default: ``target=None``
+        method : <list>
+            Ensemble feature selectors, replacing the saved ones. Required to add ensemble models, if functions were used as methods. 
+            Default: ``method=None``
+        n_jobs : <int>
+            Number of worker processes used to add ensemble models. Default: ``n_jobs=1``
+    
+        Returns
+        -----
+        A <UBaymodel>.
+        """
+        with np.load(path, allow_pickle=False) as arrays:
+            meta = json.loads(str(arrays["meta"]))
+            if meta["format_version"] > _FORMAT_VERSION:
+                sys.exit("Error: unsupported file format version " + str(meta["format_version"]))
+            model = cls.__new__(cls)
+            model.nrow, model.ncol = meta["nrow"], meta["ncol"]
+            model.feat_names = [str(f) for f in arrays["feat_names"]]
+            model.ensemble_success = arrays["ensemble_success"]
+            model.count_vector = arrays["count_vector"]
+            model.weights = arrays["weights"]
+            model.block_matrix = arrays["block_matrix"] if "block_matrix" in arrays.files else None
+            
+            model.constraints = []
+            for k in range(meta["num_constraints"]):
+                A, block_matrix = [sp.csr_matrix((arrays["constraint%d_%s_data" % (k, name)], 
+                                                  arrays["constraint%d_%s_indices" % (k, name)],
+                                                  arrays["constraint%d_%s_indptr" % (k, name)]),
+                                                 shape=tuple(arrays["constraint%d_%s_shape" % (k, name)]))
+                                   for name in ["A", "block_matrix"]]
+                model.constraints.append(UBayconstraint(rho=arrays["constraint%d_rho" % k], A=A, 
+                                                        b=arrays["constraint%d_b" % k], block_matrix=block_matrix))
+        
+        model.ensemble_store = None
+        model.ensemble_packed = _mmap_npz(path, "ensemble_packed")
+        
+        model.data = None if data is None else _prepare_data(data)
+        model.target = None if target is None else _prepare_target(target)
+        if (model.data is not None) and (np.shape(model.data) != (model.nrow, model.ncol)):
+            sys.exit("Error: dimensions of data do not match the saved model")
+        
+        model.M = meta["M"]
+        model.tt_split = meta["tt_split"]
+        model.nr_features = meta["nr_features"]
+        model.method = meta["method"] if method is None else method
+        model.prior_model = meta["prior_model"]
+        model.l = meta["l"]
+        model.binary = meta["binary"]
+        model.random_state = meta["random_state"]
+        model.n_jobs = n_jobs
+        model.ensemble_fails = meta["ensemble_fails"]
+        model.mrmr_engine = None
+        model.checkpoint_dir = None
+        model.checkpoint_every = 10
+        model.checkpoint_members = {}
+        model.metrics = None
+        model.correlation_cache = OrderedDict()
+        model.reduced = False
+        # continue the seed sequence where the saved model stopped
+        model.seed_sequence = np.random.SeedSequence(int(meta["entropy"]), 
+                                                     n_children_spawned=meta["n_children_spawned"])
+        model.setOptim(**meta["optim"])
+        return model
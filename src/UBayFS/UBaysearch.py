@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+Local search for the UBayFS utility with incremental (delta) evaluation.
+
+Flipping a single feature changes the utility by one posterior score, and shifts the constraint
+left-hand sides ``A * state`` by one column of ``A``. The class below maintains the utility and the
+admissibility terms of all constraints, such that a flip costs O(nnz) of the affected columns
+instead of a full re-evaluation.
+"""
+
+import numpy as np
+import scipy.sparse as sp
+import time
+
+
+class LocalSearch():
+    """
+    Incrementally evaluated feature set for the log-utility ``log(sum_{j selected} exp(theta_j) + l * admissibility)``,
+    which is the fitness used in ``UBaymodel.train``.
+
+    PARAMETERS
+    -----
+    theta : <numpy array>
+        Log-scaled posterior scores of the features.
+    l : <float>
+        Lagrange parameter.
+    constraints : <list> of <UBayconstraint>
+        Constraint groups (compiled).
+    state : <numpy array>
+        Binary 1-d array with the initial feature set.
+    """
+
+    # number of flips after which all running sums are recomputed, to avoid accumulating rounding errors
+    REFRESH = 100000
+
+    def __init__(self, theta, l, constraints, state):
+        self.p = np.exp(theta)
+        self.l = l
+        self.n = len(theta)
+        self.groups = []
+        for const in constraints:
+            A = sp.csc_matrix(const.A, dtype=float)
+            group = {"identity": const.identity_block, "A": A, "b": const.b, "rho": const.rho,
+                     "hard": const.rho == np.inf}
+            if not const.identity_block:
+                # blocks containing each feature: columns of the binary block matrix
+                group["B"] = sp.csc_matrix(const.block_matrix != 0, dtype=float)
+            self.groups.append(group)
+        self.reset(state)
+
+    def reset(self, state):
+        """
+        Set the feature set and compute all running sums from scratch.
+        """
+        self.x = (np.asarray(state) == 1).astype(np.int8)
+        self.selected = np.zeros(self.n, dtype=np.int64)
+        self.position = np.full(self.n, -1, dtype=np.int64)
+        sel = np.where(self.x == 1)[0]
+        self.num_selected = len(sel)
+        self.selected[:len(sel)] = sel
+        self.position[sel] = np.arange(len(sel))
+        self.score = np.sum(self.p[sel])
+        self.flips = 0
+
+        for group in self.groups:
+            if group["identity"]:
+                block_state = self.x.astype(float)
+            else:
+                group["count"] = np.asarray(group["B"] @ self.x.astype(float)).ravel()
+                block_state = (group["count"] > 0).astype(float)
+            group["lhs"] = np.asarray(group["A"] @ block_state).ravel()
+            group["contrib"] = self._contribution(group, np.arange(len(group["b"])))
+            group["violated"] = (group["lhs"] > group["b"]) & group["hard"]
+            group["adm"] = np.sum(group["contrib"])
+            group["num_violated"] = int(np.sum(group["violated"]))
+
+    def _contribution(self, group, rows):
+        """
+        Log-admissibility terms of constraint rows with finite rho; hard constraints contribute 0.
+        """
+        b, lhs, rho = group["b"][rows], group["lhs"][rows], group["rho"][rows]
+        soft = ~group["hard"][rows]
+        with np.errstate(invalid="ignore"):
+            z = b - lhs * rho
+            return np.where((lhs > b) & soft, np.log(2) - np.logaddexp(0, -z), 0.)
+
+    def flip(self, j):
+        """
+        Flip feature ``j`` and update the utility and all constraint terms.
+        """
+        delta = 1 if self.x[j] == 0 else -1
+        self.x[j] += delta
+        self.score += delta * self.p[j]
+
+        # selected features are kept in an array for uniform sampling
+        if delta == 1:
+            self.selected[self.num_selected] = j
+            self.position[j] = self.num_selected
+            self.num_selected += 1
+        else:
+            last = self.selected[self.num_selected - 1]
+            self.selected[self.position[j]] = last
+            self.position[last] = self.position[j]
+            self.position[j] = -1
+            self.num_selected -= 1
+
+        for group in self.groups:
+            if group["identity"]:
+                changed = [j]
+            else:
+                B = group["B"]
+                blocks = B.indices[B.indptr[j]:B.indptr[j+1]]
+                group["count"][blocks] += delta
+                changed = blocks[group["count"][blocks] == (1 if delta == 1 else 0)]
+            A = group["A"]
+            for k in changed:
+                rows = A.indices[A.indptr[k]:A.indptr[k+1]]
+                if len(rows) == 0:
+                    continue
+                group["lhs"][rows] += delta * A.data[A.indptr[k]:A.indptr[k+1]]
+                contrib = self._contribution(group, rows)
+                group["adm"] += (contrib - group["contrib"][rows]).sum()
+                group["contrib"][rows] = contrib
+                violated = (group["lhs"][rows] > group["b"][rows]) & group["hard"][rows]
+                group["num_violated"] += int(violated.sum()) - int(group["violated"][rows].sum())
+                group["violated"][rows] = violated
+
+        self.flips += 1
+        if self.flips % self.REFRESH == 0:
+            self.reset(self.x)
+
+    def fitness(self):
+        """
+        Log-utility of the current feature set.
+        """
+        if any(group["num_violated"] > 0 for group in self.groups):
+            admissibility = 0.
+        else:
+            admissibility = np.exp(sum(group["adm"] for group in self.groups))
+        with np.errstate(divide="ignore"):
+            return np.log(self.score + self.l * admissibility)
+
+    def state(self):
+        """
+        Binary 1-d <numpy array> with the current feature set.
+        """
+        return self.x.astype(int)
+
+    def anneal(self, steps, temperature, rng, deadline=None, stop_steps=None, tol=0, uniform=0.1):
+        """
+        Simulated annealing with linearly decreasing temperature, ending in a pure local search.
+        A move removes a selected feature, adds a feature, or swaps a selected and an unselected feature.
+        Candidates are drawn proportional to their posterior scores, and uniformly with probability ``uniform``.
+
+        PARAMETERS
+        -----
+        steps : <int>
+            Number of moves.
+        temperature : <float>
+            Initial temperature on the scale of the log-utility.
+        rng : <numpy Generator>
+            Random number generator.
+        deadline : <float>
+            Wall-clock time (``time.time()``) at which the search is stopped. Default: ``deadline=None``
+        stop_steps : <int>
+            Stop if the best fitness did not improve by more than ``tol`` (relative) within ``stop_steps`` moves.
+            Default: ``stop_steps=None``
+
+        Returns
+        -----
+        A <tuple> with the best feature set (binary <numpy array>), its fitness, the number of moves performed,
+        and the reason for stopping ("maxiter", "converged" or "time_budget").
+        """
+        cdf = np.cumsum(self.p)
+        current = self.fitness()
+        best, best_selected = current, self.selected[:self.num_selected].copy()
+        last_improvement = 0
+        stop_reason = "maxiter"
+        chunk = 1024
+
+        step = 0
+        while step < steps:
+            if step % chunk == 0:
+                if (deadline is not None) and (time.time() >= deadline):
+                    stop_reason = "time_budget"
+                    break
+                u = rng.random((chunk, 4))
+                candidates = np.where(u[:,0] < uniform, (u[:,1] * self.n).astype(np.int64),
+                                      np.searchsorted(cdf, u[:,1] * cdf[-1]))
+                candidates = np.minimum(candidates, self.n - 1)
+            j = candidates[step % chunk]
+            u_move, u_accept = u[step % chunk, 2], u[step % chunk, 3]
+            T = temperature * (1 - step / steps)
+
+            if (self.x[j] == 0) and (self.num_selected > 0) and (u_move < 0.5):
+                moves = [j, self.selected[int(u_move * 2 * self.num_selected)]]
+            else:
+                moves = [j]
+            for m in moves:
+                self.flip(m)
+            new = self.fitness()
+
+            if (new >= current) or ((T > 0) and np.isfinite(new) and (u_accept < np.exp((new - current) / T))):
+                current = new
+                if new > best:
+                    if (not np.isfinite(best)) or (new - best > tol * np.abs(best)):
+                        last_improvement = step
+                    best, best_selected = new, self.selected[:self.num_selected].copy()
+            else:
+                for m in reversed(moves):
+                    self.flip(m)
+            step += 1
+
+            if (stop_steps is not None) and (step - last_improvement >= stop_steps):
+                stop_reason = "converged"
+                break
+
+        x_best = np.zeros(self.n, dtype=int)
+        x_best[best_selected] = 1
+        return x_best, best, step, stop_reason
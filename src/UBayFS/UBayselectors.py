@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+Built-in filter feature selectors for the UBayFS ensemble.
+
+Each selector scores all features of a training split at once and the 
+``nr_features`` features with the highest scores are selected.
+"""
+
+import numpy as np
+import scipy.sparse as sp
+from collections import OrderedDict
+from sklearn.feature_selection import chi2, f_classif, f_regression, mutual_info_classif, mutual_info_regression
+
+
+# method names accepted in UBaymodel(method=...), mapped to the scoring functions below
+FILTER_METHODS = {"chi": "chi2", "chi2": "chi2", 
+                  "fisher": "fisher", 
+                  "mi": "mutual_info", "mutual_info": "mutual_info", 
+                  "f_test": "f_test", "anova": "f_test"}
+
+# selectors which require a classification target
+CLASSIFICATION_METHODS = ["chi2", "fisher"]
+
+
+def column_sums(X):
+    """
+    Column sums of a dense or sparse matrix as 1-d array.
+    """
+    return np.asarray(X.sum(axis=0)).ravel()
+
+
+def column_centered_sumsq(X, center):
+    """
+    Column sums of squared deviations from ``center`` (one value per column) of a dense or sparse matrix as 1-d array. 
+    The deviations are formed before squaring, which avoids the cancellation of sum(x^2) - n * center^2 for columns with a large mean.
+    """
+    if sp.issparse(X):
+        X = sp.csr_matrix(X)
+        nnz = np.bincount(X.indices, minlength=X.shape[1])
+        return np.bincount(X.indices, weights=(X.data - center[X.indices]) ** 2, minlength=X.shape[1]) + \
+            (X.shape[0] - nnz) * center ** 2
+    return np.einsum("ij,ij->j", X - center, X - center)
+
+
+def column_range(X):
+    """
+    Column minima and maxima of a dense or sparse matrix (including implicit zeros) as 1-d arrays.
+    """
+    if sp.issparse(X):
+        return X.min(axis=0).toarray().ravel(), X.max(axis=0).toarray().ravel()
+    return np.min(X, axis=0), np.max(X, axis=0)
+
+
+def cross_products(X, v):
+    """
+    Products X^T v of a dense or sparse matrix with a dense vector or matrix.
+    """
+    return np.asarray(X.T @ v)
+
+
+def chi2_scores(X, y):
+    """
+    Chi-square statistic between each feature and the class labels. 
+    Features with negative values are shifted to a minimum of zero; sparse data is densified in this case.
+    """
+    col_min, _ = column_range(X)
+    if np.any(col_min < 0):
+        X = X.toarray() if sp.issparse(X) else X
+        X = X - np.minimum(col_min, 0)
+    scores, _ = chi2(X, y)
+    return scores
+
+
+def fisher_scores(X, y):
+    """
+    Fisher score of each feature: between-class variance of the class means divided by the within-class variance.
+    """
+    classes, y_ind = np.unique(y, return_inverse=True)
+    n_c = np.bincount(y_ind)
+    
+    # class means and within-class sums of squares are computed per class from deviations, 
+    # such that the score does not depend on the offset of a feature
+    means = np.zeros((len(classes), X.shape[1]))
+    within = np.zeros(X.shape[1])
+    for c in range(len(classes)):
+        X_c = X[y_ind == c]
+        means[c] = column_sums(X_c) / n_c[c]
+        within += column_centered_sumsq(X_c, means[c])
+    
+    between = n_c @ ((means - n_c @ means / X.shape[0]) ** 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return between / within
+
+
+def f_scores(X, y, binary):
+    """
+    ANOVA F-statistic (classification) or univariate linear regression F-statistic (regression).
+    """
+    scores, _ = f_classif(X, y) if binary else f_regression(X, y)
+    return scores
+
+
+def mutual_info_scores(X, y, binary, random_state=None):
+    """
+    Estimated mutual information between each feature and the target. 
+    Features of sparse data are treated as discrete, as in scikit-learn.
+    """
+    if binary:
+        return mutual_info_classif(X, y, random_state=random_state)
+    return mutual_info_regression(X, y, random_state=random_state)
+
+
+def filter_ranks(method, X, y, nr_features, binary, random_state=None):
+    """
+    Select features with a built-in filter method.
+    
+    PARAMETERS
+    -----
+    method : <string>
+        Name of the filter method, see ``FILTER_METHODS``.
+    X : <numpy array>
+        Training data.
+    y : <numpy array>
+        Training labels.
+    nr_features : <int>
+        Number of features to select.
+    binary : <boolean>
+        Classification (True) or regression (False) task.
+    random_state : <int>
+        Seed for randomized estimators (mutual information). 
+        
+    Returns
+    -----
+    A <numpy array> with the column indices of the selected features, ordered by decreasing score.
+    """
+    name = FILTER_METHODS[method]
+    if name == "chi2":
+        scores = chi2_scores(X, y)
+    elif name == "fisher":
+        scores = fisher_scores(X, y)
+    elif name == "f_test":
+        scores = f_scores(X, y, binary)
+    else:
+        scores = mutual_info_scores(X, y, binary, random_state)
+    
+    scores = np.where(np.isnan(scores), -np.inf, scores)
+    return np.argsort(-scores, kind="stable")[:nr_features]
+
+
+class MRMREngine():
+    """
+    Shared mRMR engine for all train/test splits of one dataset.
+    
+    Implements the mRMR variant of the ``mrmr`` package (F-statistic relevance, absolute Pearson correlation 
+    redundancy, mean quotient), but works on index subsets of one shared (dense or sparse) data array. Sufficient statistics 
+    (column sums, sums of squares, class sums or cross-products with the target) are computed once on the full 
+    data; a split is evaluated by subtracting the contribution of its held-out rows. Correlation columns 
+    X^T x_j of selected features are cached across splits, since the ensemble models mostly select the same features. 
+    The cache keeps the most recently used columns up to ``CACHE_BYTES``. 
+    All statistics refer to the columns shifted by their means on the full data (and the centered target for regression), 
+    which avoids cancellation for features with a large mean; the shift is applied algebraically, X is not copied.
+    
+    PARAMETERS
+    -----
+    X : <numpy array> or <scipy sparse matrix>
+        Data matrix shared by all splits.
+    y : <numpy array>
+        Response variable.
+    binary : <boolean>
+        Classification (True) or regression (False) task.
+    """
+    
+    FLOOR = .001
+    # memory limit of the cached correlation columns (64 MB)
+    CACHE_BYTES = 2**26
+    
+    def __init__(self, X, y, binary):
+        self.X = X
+        self.y = np.asarray(y, dtype=float)
+        self.binary = binary
+        self.gram = OrderedDict()
+        self.gram_size = max(1, self.CACHE_BYTES // (8 * X.shape[1]))
+        
+        self.shift = column_sums(X) / X.shape[0]
+        self.sums = column_sums(X) - X.shape[0] * self.shift
+        self.sumsq = column_centered_sumsq(X, self.shift)
+        if binary:
+            self.classes, y_ind = np.unique(y, return_inverse=True)
+            self.Y = np.eye(len(self.classes))[y_ind]
+            self.class_sums = self.shifted_cross_products(X, self.Y).T
+        else:
+            self.y = self.y - np.mean(self.y)
+            self.xy = self.shifted_cross_products(X, self.y)
+    
+    def shifted_cross_products(self, X, v):
+        """
+        Products (X - shift)^T v of rows of the data with a dense vector or matrix, without shifting X.
+        """
+        return cross_products(X, v) - np.multiply.outer(self.shift, np.sum(v, axis=0))
+    
+    def shifted_column(self, X, j):
+        """
+        Column j of rows of the data, shifted by its mean on the full data.
+        """
+        return self.column(X, j) - self.shift[j]
+    
+    def gram_column(self, j):
+        """
+        Cross-products of all (shifted) features with feature j over all rows.
+        """
+        if j in self.gram:
+            self.gram.move_to_end(j)
+        else:
+            self.gram[j] = self.shifted_cross_products(self.X, self.shifted_column(self.X, j))
+            if len(self.gram) > self.gram_size:
+                self.gram.popitem(last=False)
+        return self.gram[j]
+    
+    @staticmethod
+    def column(X, j):
+        """
+        Column j of a dense or sparse matrix as dense 1-d array.
+        """
+        if sp.issparse(X):
+            return X[:,[j]].toarray().ravel()
+        return X[:,j]
+    
+    def ranks(self, test_idx, nr_features):
+        """
+        Select features with mRMR on all rows except the held-out rows.
+        
+        PARAMETERS
+        -----
+        test_idx : <numpy array>
+            Indices of the held-out rows of the split.
+        nr_features : <int>
+            Number of features to select.
+        
+        Returns
+        -----
+        A <numpy array> with the column indices of the selected features, in order of selection.
+        """
+        X_test = self.X[test_idx]
+        n = self.X.shape[0] - len(test_idx)
+        sums = self.sums - (column_sums(X_test) - len(test_idx) * self.shift)
+        ss = self.sumsq - column_centered_sumsq(X_test, self.shift) - sums ** 2 / n
+        
+        # relevance: F-statistic
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if self.binary:
+                Y_test = self.Y[test_idx]
+                n_c = np.sum(self.Y, axis=0) - np.sum(Y_test, axis=0)
+                class_sums = self.class_sums - self.shifted_cross_products(X_test, Y_test).T
+                ss_between = np.sum(class_sums ** 2 / n_c[:,None], axis=0) - sums ** 2 / n
+                relevance = (ss_between / (len(n_c) - 1)) / ((ss - ss_between) / (n - len(n_c)))
+            else:
+                y_test = self.y[test_idx]
+                y_sum = np.sum(self.y) - np.sum(y_test)
+                y_ss = np.sum(self.y ** 2) - np.sum(y_test ** 2) - y_sum ** 2 / n
+                corr = (self.xy - self.shifted_cross_products(X_test, y_test) - sums * y_sum / n) / np.sqrt(ss * y_ss)
+                relevance = corr ** 2 / (1 - corr ** 2) * (n - 2)
+        relevance = np.nan_to_num(relevance, nan=0.0)
+        
+        features = np.where(relevance > 0)[0]
+        nr_features = min(nr_features, len(features))
+        relevance = relevance[features]
+        redundancy_sum = np.zeros(len(features))
+        candidates = np.ones(len(features), dtype=bool)
+        selected = []
+        
+        for i in range(nr_features):
+            if i > 0:
+                last = selected[-1]
+                cov = self.gram_column(last)[features] - \
+                    self.shifted_cross_products(X_test, self.shifted_column(X_test, last))[features] - \
+                    sums[features] * sums[last] / n
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    corr = cov / np.sqrt(ss[features] * ss[last])
+                redundancy_sum += np.clip(np.abs(np.nan_to_num(corr, nan=self.FLOOR)), self.FLOOR, None)
+                denominator = redundancy_sum / i
+                denominator[denominator == 1.0] = np.inf
+            else:
+                denominator = np.ones(len(features))
+            
+            score = np.where(candidates, relevance / denominator, -np.inf)
+            best = int(np.argmax(score))
+            candidates[best] = False
+            selected.append(features[best])
+        return np.array(selected, dtype=int)
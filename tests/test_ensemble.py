@@ -0,0 +1,51 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "UBayFS"))
+
+from UBaymodel import UBaymodel
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "docs", "notebooks", "data")
+
+
+@pytest.fixture(scope="module")
+def example():
+    data = pd.read_csv(os.path.join(DATA_DIR, "data.csv"))
+    labels = pd.read_csv(os.path.join(DATA_DIR, "labels.csv"))
+    return data, (labels.values.ravel() == "M").astype(int)
+
+
+def test_parallel_build_matches_serial(example):
+    data, target = example
+    serial = UBaymodel(data, target, M=6, nr_features=5, method=["fisher", "f_test"], random_state=7)
+    parallel = UBaymodel(data, target, M=6, nr_features=5, method=["fisher", "f_test"], random_state=7, n_jobs=2)
+    assert np.array_equal(serial.ensemble_matrix.values, parallel.ensemble_matrix.values)
+    assert np.array_equal(serial.counts.values, parallel.counts.values)
+
+
+def test_add_ensembles_matches_larger_M(example):
+    data, target = example
+    grown = UBaymodel(data, target, M=4, nr_features=5, method=["fisher"], random_state=3)
+    grown.addEnsembles(3)
+    full = UBaymodel(data, target, M=7, nr_features=5, method=["fisher"], random_state=3)
+    assert grown.M == 7
+    assert np.array_equal(grown.ensemble_matrix.values, full.ensemble_matrix.values)
+    assert np.array_equal(grown.counts.values, full.counts.values)
+
+
+def test_checkpoint_resume_matches_full_build(example, tmp_path):
+    data, target = example
+    settings = dict(M=6, nr_features=5, method=["fisher"], random_state=5, checkpoint_every=2)
+    full = UBaymodel(data, target, **settings)
+    first = UBaymodel(data, target, checkpoint_dir=str(tmp_path), **settings)
+    # drop one completed chunk, which is rebuilt on resume
+    os.remove(os.path.join(str(tmp_path), "members_%08d.npz" % 2))
+    resumed = UBaymodel(data, target, checkpoint_dir=str(tmp_path), **settings)
+    assert os.path.exists(os.path.join(str(tmp_path), "members_%08d.npz" % 2))
+    for model in [first, resumed]:
+        assert np.array_equal(model.ensemble_matrix.values, full.ensemble_matrix.values)
+        assert np.array_equal(model.counts.values, full.counts.values)
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "UBayFS"))
+
+from UBaymodel import UBaymodel
+from UBayconstraint import UBayconstraint
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "docs", "notebooks", "data")
+
+
+@pytest.fixture(scope="module")
+def model():
+    data = pd.read_csv(os.path.join(DATA_DIR, "data.csv"))
+    labels = pd.read_csv(os.path.join(DATA_DIR, "labels.csv"))
+    target = (labels.values.ravel() == "M").astype(int)
+    model = UBaymodel(data, target, M=10, nr_features=10, method=["fisher"], random_state=1)
+    constraints = UBayconstraint(rho=np.array([np.inf, np.inf]), constraint_types=["max_size", "cannot_link"],
+                                 constraint_vars=[3, [0, 1]], num_elements=data.shape[1])
+    model.setConstraints(constraints)
+    return model
+
+
+@pytest.mark.parametrize("l", [0.05, 1.])
+def test_milp_compares_with_full_feature_set(model, l):
+    # for small l, the inadmissible full feature set has a higher utility than every admissible feature set
+    model.l = l
+    model.setOptim("milp", 10, 10)
+    x, selected = model.train()
+    theta = model.posteriorExpectation()
+    fitness = model._evaluateFitness(theta, x.values.T)[0]
+    full = model._evaluateFitness(theta, np.ones((1, model.ncol), dtype=int))[0]
+    assert fitness >= full
+    assert len(selected) == (model.ncol if l == 0.05 else 3)
+    assert model.getTrainInfo()["stop_reason"] == "optimal"
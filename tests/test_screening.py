@@ -0,0 +1,45 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "UBayFS"))
+
+from UBaymodel import UBaymodel
+from UBayconstraint import UBayconstraint
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "docs", "notebooks", "data")
+
+
+@pytest.fixture(scope="module")
+def model():
+    data = pd.read_csv(os.path.join(DATA_DIR, "data.csv"))
+    labels = pd.read_csv(os.path.join(DATA_DIR, "labels.csv"))
+    target = (labels.values.ravel() == "M").astype(int)
+    model = UBaymodel(data, target, M=10, nr_features=10, method=["fisher"], random_state=1)
+    constraints = UBayconstraint(rho=np.array([np.inf, 1.]), constraint_types=["max_size", "cannot_link"],
+                                 constraint_vars=[5, [0, 1]], num_elements=data.shape[1])
+    model.setConstraints(constraints)
+    return model
+
+
+@pytest.mark.parametrize("optim_method", ["GA", "local", "islands"])
+def test_screen_drops_max_size_row(model, optim_method):
+    # only 3 unconstrained features are kept, so the max-size row can never be violated in the subproblem
+    model.setOptim(optim_method, 10, 5, screen=3)
+    x, selected = model.train()
+    assert len(selected) <= 5
+    assert model.getTrainInfo()["screen_exact"] is False
+
+
+def test_screen_with_empty_constraint_rows(model):
+    n = model.ncol
+    A = np.zeros((2, n))
+    A[0] = 1
+    model.setConstraints(UBayconstraint(rho=np.array([np.inf]), A=A, b=np.array([5., 0.])))
+    model.setOptim("GA", 10, 5, screen=8)
+    x, selected = model.train()
+    assert len(selected) <= 5
+    assert model.getTrainInfo()["screen_exact"] is True
@@ -0,0 +1,46 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "UBayFS"))
+
+from UBayselectors import fisher_scores, MRMREngine
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "docs", "notebooks", "data")
+
+
+def example():
+    data = pd.read_csv(os.path.join(DATA_DIR, "data.csv")).values.astype(float)
+    labels = pd.read_csv(os.path.join(DATA_DIR, "labels.csv"))
+    # standardized columns, such that an offset dominates every feature
+    data = (data - data.mean(axis=0)) / data.std(axis=0)
+    return data, (labels.values.ravel() == "M").astype(int)
+
+
+def test_fisher_scores_shift_invariant():
+    X, y = example()
+    scores = fisher_scores(X, y)
+    shifted = fisher_scores(X + 1e8, y)
+    assert np.all(np.isfinite(shifted))
+    np.testing.assert_allclose(shifted, scores, rtol=1e-3)
+    assert np.array_equal(np.argsort(-shifted)[:5], np.argsort(-scores)[:5])
+
+
+def test_fisher_scores_sparse_matches_dense():
+    X, y = example()
+    X = np.where(np.abs(X) > 1, X, 0)
+    np.testing.assert_allclose(fisher_scores(sp.csr_matrix(X), y), fisher_scores(X, y), rtol=1e-10)
+
+
+def test_mrmr_engine_shift_invariant():
+    X, y = example()
+    test_idx = np.arange(0, X.shape[0], 4)
+    for binary, target in [(True, y), (False, X[:,0] + 0.5 * X[:,5])]:
+        ranks = MRMREngine(X, target, binary).ranks(test_idx, 8)
+        shifted = MRMREngine(X + 1e8, target + 1e8, binary).ranks(test_idx, 8)
+        assert np.array_equal(ranks, shifted)
+        sparse = MRMREngine(sp.csr_matrix(X + 1e8), target, binary).ranks(test_idx, 8)
+        assert np.array_equal(ranks, sparse)
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "UBayFS"))
+
+from UBaymodel import UBaymodel
+from UBayconstraint import UBayconstraint
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "docs", "notebooks", "data")
+
+
+def max_size(size, num_elements):
+    return UBayconstraint(rho=np.array([np.inf]), constraint_types=["max_size"], constraint_vars=[size], 
+                          num_elements=num_elements)
+
+
+def test_warm_start_with_tighter_max_size():
+    data = pd.read_csv(os.path.join(DATA_DIR, "data.csv"))
+    labels = pd.read_csv(os.path.join(DATA_DIR, "labels.csv"))
+    target = (labels.values.ravel() == "M").astype(int)
+    n = data.shape[1]
+    model = UBaymodel(data, target, M=10, nr_features=10, method=["fisher"], random_state=1, 
+                      constraints=max_size(4, n), popsize=20, maxiter=30)
+    # every feature set of the first run violates the max-size of the second run
+    configs = [{"constraints": max_size(4, n), "l": 0.5}, {"constraints": max_size(3, n), "l": 2}]
+    warm = model.train_path(configs, warm_start=True)
+    cold = model.train_path(configs, warm_start=False)
+    assert warm.loc[1, "cardinality"] <= 3
+    assert warm.loc[1, "total utility"] >= cold.loc[1, "total utility"]